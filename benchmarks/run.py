@@ -0,0 +1,206 @@
+# benchmarks/run.py
+#
+# Scaling benchmarks for the simulation core:
+#
+#     python -m benchmarks.run                      # quick suite, compared to its baseline
+#     python -m benchmarks.run --suite full --filter RL
+#     python -m benchmarks.run --save-baseline      # record this machine's numbers
+
+import argparse
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.scenarios import SUITES
+from core.profiler import TurnProfiler
+from core.rl_agent import BunnyRLAgent
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+MEMORY_TURNS = 2          # turns traced for peak memory (tracemalloc is slow)
+MIN_SECONDS = 1.0         # fast scenarios repeat until they have been timed this long
+REPEAT_BUDGET = 10.0      # seconds after which a scenario is not repeated again
+
+# metric -> True if higher is better
+METRICS = {"turns_per_s": True, "us_per_update": False, "peak_mb": False}
+
+
+def time_scenario(scenario):
+    """One timed run. Returns turns/s, mean cost of an update_bunny call and per-role costs."""
+    profiler = TurnProfiler(every=scenario.turns + 1, helpers=False)
+    sim = scenario.build(profiler)
+    gc.collect()
+    start = time.perf_counter()
+    turns = sim.run(scenario.turns)
+    elapsed = time.perf_counter() - start
+    row = profiler.emit(sim.turn)
+
+    result = {"turns": turns, "mean_population": row["population"],
+              "final_population": len(sim.grid.bunnies),
+              "seconds": round(elapsed, 4), "turns_per_s": round(turns / elapsed, 3)}
+    total_ms = total_calls = 0
+    for key, calls in row.items():
+        if key.startswith("role_") and key.endswith("_calls") and calls:
+            role = key[len("role_"):-len("_calls")]
+            ms = row[f"role_{role}_ms"]
+            result[f"us_per_{role}"] = round(ms * 1000 / calls, 2)
+            total_ms += ms
+            total_calls += calls
+    result["us_per_update"] = round(total_ms * 1000 / total_calls, 2) if total_calls else 0.0
+    result["updates_per_turn"] = round(total_calls, 1)
+    return result
+
+
+def peak_memory(scenario):
+    """Peak traced allocation (MB) while building the world and running its first turns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        sim = scenario.build()
+        sim.run(min(scenario.turns, MEMORY_TURNS))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / 2**20, 2)
+
+
+def measure(scenario, repeat=3, memory=True):
+    """Fastest of `repeat` timed runs, plus peak memory.
+
+    Fast scenarios keep repeating until MIN_SECONDS have been timed; slow
+    ones stop early once REPEAT_BUDGET is spent.
+    """
+    best = None
+    runs, spent = 0, 0.0
+    while True:
+        result = time_scenario(scenario)
+        runs += 1
+        spent += result["seconds"]
+        if best is None or result["turns_per_s"] > best["turns_per_s"]:
+            best = result
+        if spent > REPEAT_BUDGET or (runs >= repeat and spent >= MIN_SECONDS):
+            break
+    if memory:
+        best["peak_mb"] = peak_memory(scenario)
+    return best
+
+
+def machine_info():
+    """What a baseline's numbers depend on besides the code."""
+    return {"system": platform.system(), "release": platform.release(), "machine": platform.machine(),
+            "processor": platform.processor(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "numpy": np.__version__}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, suite, results, scenarios):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = load_baseline(path) or {"suite": suite, "results": {}}
+    baseline["machine"] = machine_info()
+    # Merge, so a --filter run only replaces the scenarios it measured
+    for scenario in scenarios:
+        baseline["results"][scenario.name] = dict(results[scenario.name], scenario=scenario.as_dict())
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"[SAVE] Baseline for {len(scenarios)} scenarios written to {path}")
+
+
+def compare(results, baseline, threshold):
+    """Metrics that got worse than the baseline by more than `threshold` (a fraction).
+
+    Returns (scenario, metric, baseline value, new value, relative change) tuples.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in result or not old.get(metric):
+                continue
+            change = (result[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append((name, metric, old[metric], result[metric], change))
+    return regressions
+
+
+def print_result(name, result, old=None):
+    memory = f"{result['peak_mb']:>8.1f} MB" if "peak_mb" in result else f"{'-':>8} MB"
+    line = (f"{name:<40} {result['turns_per_s']:>10.2f} turns/s  "
+            f"{result['us_per_update']:>9.1f} us/update  {memory}  "
+            f"({result['turns']} turns, {result['mean_population']:.0f} bunnies on average)")
+    if old and old.get("turns_per_s"):
+        line += f"  {100 * (result['turns_per_s'] / old['turns_per_s'] - 1):+.1f}% turns/s"
+    print(line, flush=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation core")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--filter", default=None, help="only scenarios whose name contains this")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per scenario, best kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--baseline", default=None,
+                        help="baseline file (default benchmarks/baselines/<suite>.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown / growth flagged as a regression")
+    parser.add_argument("--output", default=None, help="also write the raw results as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    BunnyRLAgent.graduation_snapshots = False  # benchmarks never touch q_tables/
+
+    scenarios = SUITES[args.suite]()
+    if args.filter:
+        scenarios = [s for s in scenarios if args.filter in s.name]
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.suite}.json")
+    baseline = None if args.save_baseline else load_baseline(baseline_path)
+
+    print(f"[INFO] {len(scenarios)} scenarios from the {args.suite} suite")
+    results = {}
+    for scenario in scenarios:
+        result = measure(scenario, repeat=args.repeat, memory=not args.no_memory)
+        results[scenario.name] = result
+        old = baseline["results"].get(scenario.name) if baseline else None
+        print_result(scenario.name, result, old)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        save_baseline(baseline_path, args.suite, results, scenarios)
+        return 0
+    if baseline is None:
+        print(f"[INFO] No baseline at {baseline_path}; run with --save-baseline to record one.")
+        return 0
+
+    if baseline.get("machine") != machine_info():
+        print(f"[WARN] {baseline_path} was recorded on {baseline.get('machine')}; "
+              f"timings from another machine or setup are not comparable.")
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, old, new, change in regressions:
+        print(f"[WARN] Regression in {name}: {metric} {old} -> {new} ({100 * change:+.1f}%)")
+    if regressions:
+        return 1
+    print(f"[INFO] No regressions beyond {100 * args.threshold:.0f}% against {baseline_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+# benchmarks/scenarios.py
+#
+# Seeded, reproducible worlds for the benchmark suite.
+
+import math
+import random
+
+import numpy as np
+
+from core.bunny import Bunny
+from core.fsm_dispatcher import FSMDispatcher
+from core.grid import Grid
+from core.population import ROLES, MAX_AGE
+from core.simulation import Simulation
+
+DEFAULT_DENSITY = 0.25   # share of cells occupied when no grid size is given
+MODES = ("FSM", "RL", "RL-batched")
+
+
+def populate(grid, n, vampire_ratio=0.05, rng=random):
+    """Replace the grid's bunnies with `n` bunnies on random distinct cells.
+
+    Sexes are even, ages are uniform over a lifetime (so deaths are spread
+    out instead of arriving in one wave) and about `vampire_ratio` of them
+    are vampires. Everything is drawn from `rng`.
+    """
+    cells = grid.width * grid.height
+    if n > cells:
+        raise ValueError(f"{n} bunnies do not fit on a {grid.width}x{grid.height} grid")
+    for bunny in list(grid.bunnies):
+        grid.remove_bunny(bunny)
+    for i, cell in enumerate(rng.sample(range(cells), n)):
+        x, y = divmod(cell, grid.height)
+        bunny = Bunny(name=f"P{i}", sex=rng.choice("MF"), x=x, y=y,
+                      age=rng.randrange(MAX_AGE), mutant=rng.random() < vampire_ratio)
+        grid.place_bunny(bunny, x, y)
+    return grid
+
+
+class PopulationPin:
+    """Observer that holds the population at `target` after every turn.
+
+    Without it a scenario's cost drifts with its colony's births and deaths,
+    so the same code could look faster just because fewer bunnies survived.
+    Extra bunnies are removed at random (their RL agents released), missing
+    ones are placed on random empty cells with populate()'s mix of sexes,
+    ages and vampires. Everything is drawn from `seed`.
+    """
+
+    def __init__(self, target, vampire_ratio=0.05, seed=0):
+        self.target = target
+        self.vampire_ratio = vampire_ratio
+        self.rng = np.random.default_rng(seed)
+        self.placed = 0
+
+    def __call__(self, sim):
+        grid, pop = sim.grid, sim.grid.population
+        extra = len(pop) - self.target
+        if extra > 0:
+            for idx in self.rng.choice(pop.alive_ids(), extra, replace=False).tolist():
+                bunny = pop.views[idx]
+                grid.remove_bunny(bunny)
+                sim.dispatcher.release_agent(bunny)
+        missing = -extra
+        attempts = 0
+        while missing > 0 and attempts < 100 * self.target:
+            attempts += 1
+            x, y = int(self.rng.integers(grid.width)), int(self.rng.integers(grid.height))
+            if not grid.is_empty(x, y):
+                continue
+            bunny = Bunny(name=f"Pin{self.placed}", sex="MF"[self.rng.integers(2)], x=x, y=y,
+                          age=int(self.rng.integers(MAX_AGE)),
+                          mutant=bool(self.rng.random() < self.vampire_ratio))
+            grid.place_bunny(bunny, x, y)
+            self.placed += 1
+            missing -= 1
+
+
+class Scenario:
+    """One benchmark world: population, grid size, controller and vampire ratio.
+
+    Runs `turns` turns from a world built entirely from `seed`, with empty
+    Q-tables, so two runs of the same scenario do the same work. With
+    pinned=True (the default) a PopulationPin keeps the population at its
+    starting size; unpinned runs stop early if the colony dies out.
+    """
+
+    def __init__(self, population, mode="FSM", vampire_ratio=0.05, size=None, turns=20, seed=0,
+                 pinned=True):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {MODES}")
+        if size is None:
+            side = max(20, math.ceil(math.sqrt(population / DEFAULT_DENSITY)))
+            size = (side, side)
+        self.population = population
+        self.mode = mode
+        self.vampire_ratio = vampire_ratio
+        self.size = size
+        self.turns = turns
+        self.seed = seed
+        self.pinned = pinned
+
+    @property
+    def name(self):
+        width, height = self.size
+        name = f"pop{self.population}-grid{width}x{height}-{self.mode}-v{self.vampire_ratio:g}"
+        return name if self.pinned else name + "-unpinned"
+
+    def build(self, profiler=None):
+        rng = random.Random(self.seed)
+        width, height = self.size
+        random.seed(self.seed)  # the Grid's own initial spawn, removed by populate
+        grid = populate(Grid(width=width, height=height), self.population, self.vampire_ratio, rng)
+        dispatcher = FSMDispatcher(mode=self.mode.split("-")[0], batched=self.mode == "RL-batched",
+                                   shared_tables={role: {} for role in ROLES})
+        # The turns themselves draw from the global generator
+        random.seed(rng.getrandbits(64))
+        sim = Simulation(grid=grid, dispatcher=dispatcher, profiler=profiler)
+        if self.pinned:
+            sim.add_observer(PopulationPin(self.population, self.vampire_ratio, rng.getrandbits(64)))
+        return sim
+
+    def as_dict(self):
+        return {"population": self.population, "mode": self.mode, "vampire_ratio": self.vampire_ratio,
+                "size": list(self.size), "turns": self.turns, "seed": self.seed, "pinned": self.pinned}
+
+
+def _turns_for(population):
+    # About 20k bunny updates per run, so the large worlds stay affordable
+    return max(3, min(20, 20_000 // max(population, 1)))
+
+
+def sweep(populations, modes=MODES, vampire_ratios=(0.05,), densities=(), seed=0):
+    """Population x mode at the default density, plus vampire-ratio and
+    grid-size sweeps at the median population."""
+    scenarios = [Scenario(n, mode, vampire_ratios[0], turns=_turns_for(n), seed=seed)
+                 for n in populations for mode in modes]
+    pivot = sorted(populations)[len(populations) // 2]
+    for ratio in vampire_ratios[1:]:
+        for mode in modes:
+            scenarios.append(Scenario(pivot, mode, ratio, turns=_turns_for(pivot), seed=seed))
+    for density in densities:
+        side = math.ceil(math.sqrt(pivot / density))
+        for mode in modes:
+            scenarios.append(Scenario(pivot, mode, vampire_ratios[0], size=(side, side),
+                                      turns=_turns_for(pivot), seed=seed))
+    return scenarios
+
+
+SUITES = {
+    "quick": lambda: sweep([10, 100, 1000], vampire_ratios=(0.05, 0.0, 0.25), densities=(0.05, 0.6)),
+    "full": lambda: sweep([10, 100, 1000, 10_000, 100_000],
+                          vampire_ratios=(0.05, 0.0, 0.25), densities=(0.05, 0.6)),
+}
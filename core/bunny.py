@@ -1,8 +1,55 @@
 import random
-import pygame
+from core.population import ADULT_AGE, MAX_AGE, MUTANT_MAX_AGE, SEXES, SEX_CODES, STATES, state_code
+
+
+class _Column:
+    """Bunny attribute backed by a Population column once the bunny is placed.
+
+    Detached bunnies (not yet placed, or already removed) keep the value on
+    the instance under a leading-underscore name.
+    """
+
+    def __init__(self, column, decode=None, encode=None, setter=None):
+        self.column = column
+        self.decode = decode
+        self.encode = encode
+        self.setter = setter  # Population method for writes that can change the role
+
+    def __set_name__(self, owner, name):
+        self.slot = "_" + name
+
+    def __get__(self, bunny, owner=None):
+        if bunny is None:
+            return self
+        pop = bunny._pop
+        if pop is None:
+            return getattr(bunny, self.slot)
+        value = getattr(pop, self.column).item(bunny.id)
+        return self.decode(value) if self.decode else value
+
+    def __set__(self, bunny, value):
+        pop = bunny._pop
+        if pop is None:
+            setattr(bunny, self.slot, value)
+        elif self.setter:
+            getattr(pop, self.setter)(bunny.id, value)
+        else:
+            getattr(pop, self.column)[bunny.id] = self.encode(value) if self.encode else value
+
 
 class Bunny:
+    x = _Column("x")
+    y = _Column("y")
+    age = _Column("age", setter="set_age")
+    sex = _Column("sex", decode=SEXES.__getitem__, encode=SEX_CODES.__getitem__)
+    is_mutant = _Column("mutant", setter="set_mutant")
+    state = _Column("state", decode=STATES.__getitem__, encode=state_code)
+    has_baby = _Column("has_baby", encode=bool)
+    controlled = _Column("controlled", encode=bool)
+
     def __init__(self, name, sex, x, y, age=0, mutant=False):
+        self._pop = None   # Population this bunny is a view onto, if placed
+        self.id = None     # row in that Population
         self.name = name
         self.sex = sex  # 'M' or 'F'
         self.x = x
@@ -11,15 +58,16 @@ class Bunny:
         self.is_mutant = mutant
         self.state = "IDLE"
         self.has_baby = False
+        self.controlled = False
         self.adult = False
         self.color = (255, 0, 0) if mutant else (0, 0, 255) if sex == 'M' else (255, 105, 180)
 
     
     def is_adult(self):
-        return self.age >= 2
+        return self.age >= ADULT_AGE
 
     def max_age(self):
-        return 50 if self.is_mutant else 10
+        return MUTANT_MAX_AGE if self.is_mutant else MAX_AGE
     
     def make_baby(self, x, y, grid):
         self.has_baby = True
@@ -50,38 +98,40 @@ class Bunny:
 
     def move(self, dx, dy, grid):
         """Move the bunny by (dx, dy) if the target cell is empty and in bounds."""
-        nx, ny = self.x + dx, self.y + dy
-        if grid.in_bounds(nx, ny) and grid.cells[nx][ny] is None:
-            grid.cells[self.x][self.y] = None
-            self.x, self.y = nx, ny
-            grid.cells[nx][ny] = self
+        grid.move_bunny(self, self.x + dx, self.y + dy)
             
     def move_random(self, grid):
         directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
         random.shuffle(directions)
         for dx, dy in directions:
             nx, ny = self.x + dx, self.y + dy
-            if grid.in_bounds(nx, ny) and grid.cells[nx][ny] is None:
+            if grid.is_empty(nx, ny):
                 grid.move_bunny(self, nx, ny)
                 return
             
     def draw(self, screen, px, py):
         """Draw the bunny on the screen at position (px, py)."""
-        # Draw a square for the bunny  
-        size = 32
-        padding = 4
-        rect = pygame.Rect(px + padding, py + padding, size - 2 * padding, size - 2 * padding)
-
-        # Determine fill color
-        color = (255, 0, 0) if self.is_mutant else (0, 0, 255) if self.sex == 'M' else (255, 105, 180)
-        pygame.draw.rect(screen, color, rect)
-
-        # Juvenile indicator (gray ellipse)
-        if not self.is_adult() and not self.is_mutant:
-            pygame.draw.ellipse(screen, (200, 200, 200), rect.inflate(-10, -10))
-
-        # Vampire indicator (white "X")
-        if self.is_mutant:
-            cx, cy = px + size // 2, py + size // 2
-            pygame.draw.line(screen, (255, 255, 255), (cx - 6, cy - 6), (cx + 6, cy + 6), 2)
-            pygame.draw.line(screen, (255, 255, 255), (cx + 6, cy - 6), (cx - 6, cy + 6), 2)
+        draw_bunny_shape(screen, px, py, self.is_mutant, self.sex, self.is_adult())
+
+
+def draw_bunny_shape(screen, px, py, is_mutant, sex, adult):
+    """Draw a bunny of the given kind with its tile's top-left corner at (px, py)."""
+    import pygame
+    # Draw a square for the bunny
+    size = 32
+    padding = 4
+    rect = pygame.Rect(px + padding, py + padding, size - 2 * padding, size - 2 * padding)
+
+    # Determine fill color
+    color = (255, 0, 0) if is_mutant else (0, 0, 255) if sex == 'M' else (255, 105, 180)
+    pygame.draw.rect(screen, color, rect)
+
+    # Juvenile indicator (gray ellipse)
+    if not adult and not is_mutant:
+        pygame.draw.ellipse(screen, (200, 200, 200), rect.inflate(-10, -10))
+
+    # Vampire indicator (white "X")
+    if is_mutant:
+        cx, cy = px + size // 2, py + size // 2
+        pygame.draw.line(screen, (255, 255, 255), (cx - 6, cy - 6), (cx + 6, cy + 6), 2)
+        pygame.draw.line(screen, (255, 255, 255), (cx + 6, cy - 6), (cx - 6, cy + 6), 2)
@@ -2,6 +2,7 @@
 import torch
 import torch.nn as nn
 from torch_geometric.nn import SAGEConv
+from core.bunny_graph import BunnyGraph
 
 class BunnyGNNPolicy(nn.Module):
     def __init__(self, in_features=6, hidden_dim=32, out_features=3):
@@ -33,38 +34,27 @@ def is_valid_graph(data):
 
 # helper to convert bunny world into graph
 def build_bunny_graph(grid):
+    """Graph of the bunnies on `grid`: one node per bunny, edges within Manhattan distance 2.
+
+    The first call attaches a BunnyGraph layer to the grid (see
+    core/bunny_graph.py); later calls only patch the edges of bunnies that
+    moved since. Returns (Data, id_lookup) where id_lookup maps bunny name to
+    node index, and data.bunny_ids holds the population id of every node.
+    """
     from torch_geometric.data import Data
-    
-    node_features = []
-    edge_index = []
 
-    id_lookup = {bunny.name: idx for idx, bunny in enumerate(grid.bunnies)}
-    
-    for bunny in grid.bunnies:
-        features = [
-            bunny.age / 10.0,  # normalized age
-            1.0 if bunny.sex == 'F' else 0.0,
-            1.0 if bunny.is_adult() else 0.0,
-            1.0 if bunny.is_mutant else 0.0,
-            grid.colony_rewards['population_bonus'] / 100.0,
-            grid.colony_rewards['vampire_free_bonus'] / 100.0,
-        ]
-        node_features.append(features)
+    graph = getattr(grid, "bunny_graph", None)
+    if graph is None:
+        graph = grid.bunny_graph = BunnyGraph(grid)
+    ids, features, edge_index = graph.build()
+
+    views = grid.population.views
+    id_lookup = {views[i].name: row for row, i in enumerate(ids.tolist())}
 
-    # create edges
-    for i, bunny_i in enumerate(grid.bunnies):
-        for j, bunny_j in enumerate(grid.bunnies):
-            if i != j:
-                dist = abs(bunny_i.x - bunny_j.x) + abs(bunny_i.y - bunny_j.y)
-                if dist <= 2:
-                    edge_index.append([i, j])
-    
-    edge_index = torch.tensor(edge_index).t().contiguous()
-    x = torch.tensor(node_features, dtype=torch.float)
-    
-    return Data(x=x, edge_index=edge_index), id_lookup
+    data = Data(x=torch.from_numpy(features), edge_index=torch.from_numpy(edge_index).long())
+    data.bunny_ids = torch.from_numpy(ids).long()
+    return data, id_lookup
 
 # example usage each turn:
-# graph_data = build_bunny_graph(grid)
+# graph_data, id_lookup = build_bunny_graph(grid)
 # action_scores = gnn(graph_data)
-
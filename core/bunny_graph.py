@@ -0,0 +1,110 @@
+# core/bunny_graph.py
+#
+# NumPy side of the GNN input: node features and the "within Manhattan
+# distance 2" edge list, built from the grid's occupancy raster. The torch
+# conversion lives in core/bunny_gnn.py.
+
+import numpy as np
+from core.layers import GridLayer
+from core.population import ADULT_AGE, SEX_CODES
+
+GRAPH_RADIUS = 2
+GRAPH_OFFSETS = tuple(
+    (dx, dy)
+    for dx in range(-GRAPH_RADIUS, GRAPH_RADIUS + 1)
+    for dy in range(-GRAPH_RADIUS, GRAPH_RADIUS + 1)
+    if 0 < abs(dx) + abs(dy) <= GRAPH_RADIUS
+)
+N_NODE_FEATURES = 6
+
+
+class BunnyGraph(GridLayer):
+    """Bunny graph kept in sync with a grid.
+
+    Edges are stored as (src, dst) population ids. Bunnies placed, moved or
+    removed since the last build are marked dirty; build() drops their edges
+    and recomputes only theirs, unless more than `rebuild_fraction` of the
+    population changed, in which case it rebuilds everything. Both paths look
+    up the GRAPH_OFFSETS cells of each bunny in the occupancy raster, so a
+    build is O(N * 12) at worst instead of O(N^2).
+    """
+
+    def __init__(self, grid, rebuild_fraction=0.25):
+        self.grid = grid
+        self.rebuild_fraction = rebuild_fraction
+        self._src = np.zeros(0, dtype=np.intp)
+        self._dst = np.zeros(0, dtype=np.intp)
+        self._dirty = set()
+        self._stale = True
+        offsets = np.array(GRAPH_OFFSETS, dtype=np.intp)
+        self._dx, self._dy = offsets[:, 0], offsets[:, 1]
+        grid.add_layer(self)
+
+    # --- GridLayer hooks ---
+
+    def on_place(self, bunny):
+        self._dirty.add(bunny.id)
+
+    def on_move(self, bunny, old_x, old_y):
+        self._dirty.add(bunny.id)
+
+    def on_remove(self, bunny):
+        self._dirty.add(bunny.id)
+
+    # --- building ---
+
+    def _edges_from(self, ids):
+        """Directed edges from each id in `ids` to every bunny within the radius."""
+        pop, raster = self.grid.population, self.grid.raster
+        nx = pop.x[ids][:, None] + self._dx
+        ny = pop.y[ids][:, None] + self._dy
+        inside = (nx >= 0) & (nx < raster.width) & (ny >= 0) & (ny < raster.height)
+        src = np.broadcast_to(ids[:, None], nx.shape)[inside]
+        dst = raster.ids[nx[inside], ny[inside]]
+        found = dst >= 0
+        return src[found], dst[found].astype(np.intp)
+
+    def _update_edges(self, alive):
+        dirty = self._dirty
+        if self._stale or len(dirty) > self.rebuild_fraction * max(1, len(alive)):
+            self._src, self._dst = self._edges_from(alive)
+        elif dirty:
+            dirty_ids = np.fromiter(dirty, dtype=np.intp, count=len(dirty))
+            keep = ~(np.isin(self._src, dirty_ids) | np.isin(self._dst, dirty_ids))
+            moved = dirty_ids[self.grid.population.alive[dirty_ids]]
+            src, dst = self._edges_from(moved)
+            # Edges into a moved bunny from one that stayed put
+            back = ~np.isin(dst, moved)
+            self._src = np.concatenate([self._src[keep], src, dst[back]])
+            self._dst = np.concatenate([self._dst[keep], dst, src[back]])
+        dirty.clear()
+        self._stale = False
+
+    def node_features(self, ids):
+        """(N, N_NODE_FEATURES) float32 features, one row per population id."""
+        pop, grid = self.grid.population, self.grid
+        x = np.empty((len(ids), N_NODE_FEATURES), dtype=np.float32)
+        x[:, 0] = pop.age[ids] / 10.0                    # normalized age
+        x[:, 1] = pop.sex[ids] == SEX_CODES["F"]
+        x[:, 2] = pop.age[ids] >= ADULT_AGE
+        x[:, 3] = pop.mutant[ids]
+        x[:, 4] = grid.colony_rewards['population_bonus'] / 100.0
+        x[:, 5] = grid.colony_rewards['vampire_free_bonus'] / 100.0
+        return x
+
+    def build(self):
+        """Return (ids, features, edge_index) for the current population.
+
+        Row i of `features` is population id ids[i]; edge_index is a (2, E)
+        array of row numbers.
+        """
+        pop = self.grid.population
+        ids = pop.alive_ids().astype(np.intp)
+        self._update_edges(ids)
+        rows = np.full(pop.size, -1, dtype=np.intp)
+        rows[ids] = np.arange(len(ids))
+        edge_index = np.stack([rows[self._src], rows[self._dst]])
+        return ids, self.node_features(ids), edge_index
+
+    def detach(self):
+        self.grid.remove_layer(self)
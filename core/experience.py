@@ -0,0 +1,119 @@
+# core/experience.py
+#
+# Fixed-capacity store of RL transitions with integer-encoded states (see
+# core/qtable.py), so FSM and RL runs can be replayed for batch Q-learning or
+# GNN training instead of regenerated.
+
+import os
+import glob
+import numpy as np
+
+TRANSITION_DTYPE = np.dtype([
+    ("s", "<i4"), ("a", "i1"), ("r", "<f4"), ("s_prime", "<i4"), ("done", "?"),
+])
+
+
+class ExperienceBuffer:
+    """Ring buffer of (s, a, r, s_prime, done) rows in one structured array.
+
+    Once full, new rows overwrite the oldest. With `spill_dir` set, every
+    `chunk_size` new rows are also written to numbered .npy files there, so
+    the full history survives the ring (read it back with load_experience).
+    """
+
+    def __init__(self, capacity=100000, spill_dir=None, chunk_size=65536):
+        if spill_dir is not None and chunk_size > capacity:
+            raise ValueError("chunk_size must not exceed capacity")
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=TRANSITION_DTYPE)
+        self.size = 0
+        self.pos = 0           # next row to write
+        self.total = 0         # rows ever added
+        self.spill_dir = spill_dir
+        self.chunk_size = chunk_size
+        self._unspilled = 0
+        self._part = 0
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._part = len(glob.glob(os.path.join(spill_dir, "experience_*.npy")))
+
+    def __len__(self):
+        return self.size
+
+    def add(self, s, a, r, s_prime, done=False):
+        self.data[self.pos] = (s, a, r, s_prime, done)
+        self._advance(1)
+
+    def add_batch(self, s, a, r, s_prime, done=False):
+        """Add arrays of transitions (done may be a scalar)."""
+        n = len(s)
+        if n == 0:
+            return
+        step = self.capacity - self.chunk_size + 1 if self.spill_dir is not None else self.capacity
+        if n > step and self.spill_dir is not None:
+            # Spill between pieces so no unspilled row is overwritten
+            for i in range(0, n, step):
+                self.add_batch(s[i:i + step], a[i:i + step], r[i:i + step], s_prime[i:i + step],
+                               done[i:i + step] if np.ndim(done) else done)
+            return
+        if n > self.capacity:
+            self.total += n - self.capacity  # the older rows never fit, but they were added
+            s, a, r, s_prime = s[-self.capacity:], a[-self.capacity:], r[-self.capacity:], s_prime[-self.capacity:]
+            if np.ndim(done):
+                done = done[-self.capacity:]
+            n = self.capacity
+        rows = (self.pos + np.arange(n)) % self.capacity
+        data = self.data
+        data["s"][rows] = s
+        data["a"][rows] = a
+        data["r"][rows] = r
+        data["s_prime"][rows] = s_prime
+        data["done"][rows] = done
+        self._advance(n)
+
+    def _advance(self, n):
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+        self.total += n
+        if self.spill_dir is not None:
+            self._unspilled += n
+            while self._unspilled >= self.chunk_size:
+                self._spill(self.chunk_size)
+
+    def _recent(self, n):
+        """The last n rows, oldest first."""
+        rows = (self.pos - n + np.arange(n)) % self.capacity
+        return self.data[rows]
+
+    def _spill(self, n):
+        # Rows not yet spilled end at pos; write the oldest n of them
+        start = self._unspilled
+        rows = (self.pos - start + np.arange(n)) % self.capacity
+        path = os.path.join(self.spill_dir, f"experience_{self._part:05d}.npy")
+        np.save(path, self.data[rows])
+        self._part += 1
+        self._unspilled -= n
+
+    def flush(self):
+        """Spill whatever has not been written yet (no-op without spill_dir)."""
+        if self.spill_dir is not None and self._unspilled:
+            self._spill(self._unspilled)
+
+    def sample(self, batch_size, rng=None):
+        """Uniform random rows (with replacement) as a structured array."""
+        if self.size == 0:
+            return self.data[:0]
+        rng = rng if rng is not None else np.random.default_rng()
+        return self.data[rng.integers(0, self.size, batch_size)]
+
+    def transitions(self):
+        """Every stored row, oldest first."""
+        return self._recent(self.size)
+
+
+def load_experience(spill_dir):
+    """Concatenate the chunks an ExperienceBuffer spilled to `spill_dir`, in order."""
+    paths = sorted(glob.glob(os.path.join(spill_dir, "experience_*.npy")))
+    if not paths:
+        return np.zeros(0, dtype=TRANSITION_DTYPE)
+    return np.concatenate([np.load(p) for p in paths])
@@ -2,7 +2,12 @@
 
 
 import random
-from core.rl_agent import BunnyRLAgent, load_agent_qtable 
+from time import perf_counter_ns
+import numpy as np
+from core.rl_agent import BunnyRLAgent, load_agent_qtable, get_states
+from core.population import ROLES as ROLE_NAMES, ADULT_AGE, SEX_CODES
+from core.layers import EMPTY
+from core.qtable import as_qtable
 
 
 # ✅ Female reward function — GLOBAL SCOPE
@@ -82,7 +87,7 @@ def reward_func_male(bunny, grid):
     if any(b.sex == 'F' and b.has_baby for b in neighbors):
         reward += 10  # Found a female with a baby
 
-    if hasattr(grid, 'female_heatmap') and grid.female_heatmap.data[bunny.x][bunny.y] > 1.0:
+    if hasattr(grid, 'female_heatmap') and grid.female_heatmap.value(bunny.x, bunny.y) > 1.0:
         reward += 2  # Standing in a favorable heatmap zone
 
     if females and empty_tiles and not any(b.has_baby for b in females):
@@ -94,13 +99,13 @@ def reward_func_male(bunny, grid):
     return reward
 
 def reward_func_vampire(bunny, grid):
-    if not bunny.is_adult or not bunny.is_mutant:
+    if not bunny.is_adult() or not bunny.is_mutant:
         return 0
 
     reward = 1
     neighbors = grid.get_adjacent_bunnies(bunny.x, bunny.y)
     victims = [b for b in neighbors if not b.is_mutant]
-    adults = sum(1 for b in grid.bunnies if b.is_adult)
+    adults = grid.population.adults
     
     if adults <= 15:
         reward -= 10   # Too few adults, risk of extinction
@@ -117,7 +122,7 @@ def reward_func_vampire(bunny, grid):
     return reward
 
 def reward_func_juvenile(bunny, grid):
-    if bunny.is_adult or bunny.is_mutant:
+    if bunny.is_adult() or bunny.is_mutant:
         return 0
 
     reward = 1
@@ -133,19 +138,93 @@ def reward_func_juvenile(bunny, grid):
 
     return reward
 
+# --- Whole-batch rewards: the reward_func_* above for many bunnies of one
+# role at once, from the population columns and the occupancy raster ---
+
+def _neighbors(grid, ids):
+    """(N, 4) neighbour ids, the occupied mask, and ids safe to index columns with."""
+    pop = grid.population
+    nb = grid.raster.neighbor_ids(pop.x[ids], pop.y[ids])
+    occupied = nb >= 0
+    return nb, occupied, np.where(occupied, nb, 0)
+
+
+def _death_penalty(pop, ids):
+    return np.where(pop.age[ids] > pop.max_ages(ids), -50, 0)
+
+
+def rewards_female(ids, grid):
+    pop = grid.population
+    nb, occupied, safe = _neighbors(grid, ids)
+    males = np.count_nonzero(occupied & (pop.sex[safe] == SEX_CODES["M"])
+                             & (pop.age[safe] >= ADULT_AGE) & ~pop.mutant[safe], axis=1)
+    vampires = np.count_nonzero(occupied & pop.mutant[safe], axis=1)
+    empty = np.count_nonzero(nb == EMPTY, axis=1)
+    xs, ys = pop.x[ids], pop.y[ids]
+
+    # Same colony bonus as reward_func_female, whose first branch covers every larger threshold
+    reward = np.full(len(ids), 1 + (15 if len(grid.bunnies) >= 10 else -15))
+    reward += np.where(males > 0, 2, 0)
+    reward -= np.where(empty == 0, 5, 0)
+    reward += np.where((vampires > 0) | (grid.vampire_field.dist[xs, ys] <= 2), -10, 5)
+    reward += _death_penalty(pop, ids)
+    reward += np.where(pop.has_baby[ids], 25, np.where((males > 0) & (empty > 0), -3, 0))
+    valid = (pop.age[ids] >= ADULT_AGE) & (pop.sex[ids] == SEX_CODES["F"])
+    return np.where(valid, reward, 0)
+
+
+def rewards_male(ids, grid):
+    pop = grid.population
+    nb, occupied, safe = _neighbors(grid, ids)
+    females = occupied & (pop.sex[safe] == SEX_CODES["F"]) & (pop.age[safe] >= ADULT_AGE) & ~pop.mutant[safe]
+    any_female = females.any(axis=1)
+    vampires = (occupied & pop.mutant[safe]).any(axis=1)
+    mother_adjacent = (occupied & (pop.sex[safe] == SEX_CODES["F"]) & pop.has_baby[safe]).any(axis=1)
+    female_mother = (females & pop.has_baby[safe]).any(axis=1)
+    empty = (nb == EMPTY).any(axis=1)
+    xs, ys = pop.x[ids], pop.y[ids]
+
+    reward = np.ones(len(ids), dtype=np.int64)
+    reward += np.where(any_female, 10, 0)
+    reward -= np.where(vampires | (grid.vampire_field.dist[xs, ys] <= 2), 20, 0)
+    reward += np.where(mother_adjacent, 10, 0)
+    reward += np.where(grid.female_heatmap.values_at(xs, ys) > 1.0, 2, 0)
+    reward -= np.where(any_female & empty & ~female_mother, 1, 0)
+    reward += _death_penalty(pop, ids)
+    valid = (pop.age[ids] >= ADULT_AGE) & (pop.sex[ids] == SEX_CODES["M"])
+    return np.where(valid, reward, 0)
+
+
+def rewards_vampire(ids, grid):
+    pop = grid.population
+    nb, occupied, safe = _neighbors(grid, ids)
+    victims = (occupied & ~pop.mutant[safe]).any(axis=1)
+    vampires = np.count_nonzero(occupied & pop.mutant[safe], axis=1)
+
+    reward = np.full(len(ids), 1 - (10 if pop.adults <= 15 else 0))
+    reward += np.where(victims, 10, -1)
+    reward -= np.where(vampires > 1, 2, 0)
+    reward += _death_penalty(pop, ids)
+    valid = (pop.age[ids] >= ADULT_AGE) & pop.mutant[ids]
+    return np.where(valid, reward, 0)
+
+
+def rewards_juvenile(ids, grid):
+    # reward_func_juvenile's "grown into adult" bonus never applies: adults get 0
+    pop = grid.population
+    xs, ys = pop.x[ids], pop.y[ids]
+    reward = 1 + np.where(grid.vampire_field.dist[xs, ys] <= 2, -10, 5)
+    valid = (pop.age[ids] < ADULT_AGE) & ~pop.mutant[ids]
+    return np.where(valid, reward, 0)
+
+
 #def vampire_nearby(bunny, grid):
 #        neighbors = grid.get_adjacent_bunnies(bunny.x, bunny.y)
 #        return any(b.is_mutant for b in neighbors)
 #
 def is_vampire_in_range(grid, x, y, radius=2):
-    for dx in range(-radius, radius + 1):
-        for dy in range(-radius, radius + 1):
-            tx, ty = x + dx, y + dy
-            if grid.in_bounds(tx, ty):
-                b = grid.get_bunny_at(tx, ty)
-                if b and b.is_mutant:
-                    return True
-    return False
+    # O(1) lookup in the grid's vampire distance field (Manhattan radius)
+    return grid.nearest_vampire_distance(x, y, radius) is not None
 #
 #def move_vampire_toward_cluster(bunny, grid):
 #        heatmap = grid.get_bunny_density_map()
@@ -169,19 +248,229 @@ def is_vampire_in_range(grid, x, y, radius=2):
 #        if best_move:
 #            bunny.move(best_move[0], best_move[1], grid)
 
+# Outputs of BunnyGNNPolicy, in order (the labels of core.gnn_trainer)
+GNN_ACTIONS = ("move", "breed", "threat")
+
+# Released agents kept for reuse, at least this many and at most one per live agent
+AGENT_POOL_MIN = 64
+
+ROLE_REWARDS = {
+    'juvenile': reward_func_juvenile,
+    'male': reward_func_male,
+    'female': reward_func_female,
+    'vampire': reward_func_vampire,
+}
+
+ROLE_BATCH_REWARDS = {
+    'juvenile': rewards_juvenile,
+    'male': rewards_male,
+    'female': rewards_female,
+    'vampire': rewards_vampire,
+}
+
+
 class FSMDispatcher:
-    def __init__(self, mode="FSM"):
+    def __init__(self, mode="FSM", shared_tables=None, batched=False, gnn_policy=None, experience=None):
         self.mode = mode
+        # Optional core.experience.ExperienceBuffer collecting every transition
+        self.experience = experience
+        # In GNN mode, a BunnyGNNPolicy scores every bunny once per turn (see begin_turn)
+        self.gnn_policy = gnn_policy
+        self.gnn_scores = None
+        self._gnn_rows = None
+        # In RL mode, run each role's agents as one vectorized batch per turn
+        self.batched = batched
+        # Bunny -> BunnyRLAgent for live bunnies only; agents of dead bunnies
+        # are released into _agent_pool for reuse (see release_agent)
         self.rl_agents = {}
-        self.shared_tables = {k: load_agent_qtable(f"{k}_shared") or {} for k in ['male', 'female', 'juvenile', 'vampire']}
-
+        self._agent_pool = []
+        if shared_tables is None:
+            shared_tables = {k: load_agent_qtable(f"{k}_shared") for k in ROLE_NAMES}
+        self.shared_tables = {k: as_qtable(table) for k, table in shared_tables.items()}
+        self.np_random = None
+        # Optional core.profiler.TurnProfiler; set by Simulation(profiler=...)
+        self.profiler = None
+
+    def update_bunnies(self, bunnies, grid, turn, logger=None):
+        """Dispatch a whole turn's worth of bunnies. Returns the summed reward.
+
+        Bunnies marked `controlled` are moved from outside and skipped.
+        """
+        self.begin_turn(grid, turn)
+        pop = grid.population
+        profiler = self.profiler
+        if self.mode != "RL" or not self.batched:
+            total_reward = 0
+            for bunny in bunnies:
+                if bunny.controlled:
+                    continue
+                if profiler is None:
+                    reward = self.update_bunny(bunny, grid, turn, logger)[0]
+                else:
+                    start = perf_counter_ns()
+                    reward, role = self.update_bunny(bunny, grid, turn, logger)
+                    profiler.add_role(role, perf_counter_ns() - start)
+                total_reward += reward
+                if bunny._pop is not pop:
+                    self.release_agent(bunny, reward)
+            self.release_dead(bunnies, grid)
+            return total_reward
+
+        live = [b for b in bunnies if b._pop is pop]
+        # Bunnies that died of age this turn only collect their final reward
+        total_reward = 0
+        for bunny in bunnies:
+            if bunny._pop is not pop and not bunny.controlled:
+                reward = self.update_bunny(bunny, grid, turn, logger)[0]
+                total_reward += reward
+                self.release_agent(bunny, reward)
+        if not live:
+            return total_reward
+
+        ids = np.fromiter((b.id for b in live), dtype=np.intp, count=len(live))
+        roles = pop.roles(ids)
+        roles[pop.controlled[ids]] = -1
+        for code, role in enumerate(ROLE_NAMES):
+            group = [b for b, r in zip(live, roles.tolist()) if r == code]
+            if group:
+                start = perf_counter_ns()
+                total_reward += float(self.update_role_batch(role, group, grid, turn, logger).sum())
+                if profiler is not None:
+                    profiler.add_role(role, perf_counter_ns() - start, len(group))
+        self.release_dead(bunnies, grid)
+        return total_reward
+
+    def begin_turn(self, grid, turn):
+        """Per-turn setup before any bunny is dispatched.
+
+        In GNN mode this builds the bunny graph and runs the policy once for
+        the whole population; update_bunny then only looks up its row.
+        """
+        if self.mode != "GNN":
+            return
+        import torch
+        from core.bunny_gnn import BunnyGNNPolicy, build_bunny_graph
+
+        if self.gnn_policy is None:
+            self.gnn_policy = BunnyGNNPolicy()
+            self.gnn_policy.eval()
+        graph, _ = build_bunny_graph(grid)
+        ids = graph.bunny_ids.numpy()
+        if len(ids) == 0:
+            self.gnn_scores = None
+            return
+        with torch.no_grad():
+            self.gnn_scores = self.gnn_policy(graph).numpy()
+        rows = np.full(grid.population.size, -1, dtype=np.intp)
+        rows[ids] = np.arange(len(ids))
+        self._gnn_rows = rows
+
+    def gnn_action(self, bunny, grid):
+        """Index of the bunny's best cached GNN score (GNN_ACTIONS), or None if it has none."""
+        if self.gnn_scores is None or bunny._pop is not grid.population:
+            return None
+        rows = self._gnn_rows
+        row = rows[bunny.id] if bunny.id < len(rows) else -1
+        if row < 0:
+            return None  # born this turn, after the forward pass
+        return int(self.gnn_scores[row].argmax())
+
+    def agent_for(self, bunny, table):
+        """The bunny's agent, taken from the pool (or created) on first sight."""
+        agent = self.rl_agents.get(bunny)
+        if agent is None:
+            if self._agent_pool:
+                agent = self._agent_pool.pop()
+                agent.reset(bunny, table)
+            else:
+                agent = BunnyRLAgent(bunny, table)
+            agent.experience = self.experience
+            self.rl_agents[bunny] = agent
+        return agent
+
+    def release_agent(self, bunny, reward=None):
+        """Retire a dead bunny's agent.
+
+        With a reward, its last transition goes into the shared table as a
+        terminal update. The agent is kept for reuse while the pool is no
+        larger than the live registry.
+        """
+        agent = self.rl_agents.pop(bunny, None)
+        if agent is None:
+            return
+        if reward is not None:
+            agent.finish(reward)
+        else:
+            agent.reset(None, None)
+        if len(self._agent_pool) < max(AGENT_POOL_MIN, len(self.rl_agents)):
+            self._agent_pool.append(agent)
+
+    def release_dead(self, bunnies, grid):
+        """Release agents of bunnies that left the grid after being dispatched."""
+        pop = grid.population
+        for bunny in bunnies:
+            if bunny._pop is not pop and bunny in self.rl_agents:
+                self.release_agent(bunny)
+
+    def update_role_batch(self, role, bunnies, grid, turn, logger=None):
+        """One RL turn for every bunny of `role`, sharing the role's table.
+
+        States and rewards are built in one pass each, epsilon-greedy is one
+        vectorized draw, and the TD updates land in the shared table at once.
+        Actions still run one by one because they move bunnies on the grid.
+        Returns the array of rewards.
+
+        Unlike the scalar path, every state is read before any bunny of the
+        group moves and every reward after all of them have, so a bunny
+        does not see the moves of the ones dispatched before it. Over 10
+        turns of the pop100-10000 benchmark worlds about 0.3% of the states
+        differ from the ones a bunny-by-bunny pass would have seen.
+        """
+        if self.np_random is None:
+            self.np_random = np.random.default_rng(random.getrandbits(64))
+        rng = self.np_random
+        table = self.shared_tables[role]
+
+        agents = [self.agent_for(bunny, table) for bunny in bunnies]
+        proto = agents[0]
+
+        s = get_states(role, bunnies, grid)
+        n_actions = proto.num_actions()
+        explore = rng.random(len(bunnies)) < proto.epsilon
+        actions = np.where(explore, rng.integers(0, n_actions, len(bunnies)), table.q[s].argmax(axis=1))
+
+        for agent, bunny, action in zip(agents, bunnies, actions.tolist()):
+            agent.bunny = bunny
+            agent.act(action, grid)
+
+        s_prime = get_states(role, bunnies, grid)
+        ids = np.fromiter((b.id for b in bunnies), dtype=np.intp, count=len(bunnies))
+        rewards = ROLE_BATCH_REWARDS[role](ids, grid).astype(np.float32)
+        table.update_batch(s, actions, rewards, s_prime, proto.alpha, proto.gamma)
+        if self.experience is not None:
+            self.experience.add_batch(s, actions, rewards, s_prime)
+        return rewards
+
+
+    def _learn(self, agent, bunny, grid, s, reward, s_prime):
+        """Fold this turn's (s, 5, reward) into the table and the experience buffer.
+
+        A bunny that is already off the grid gets no bootstrapped update:
+        its transition is left on the agent for release_agent, whose
+        terminal update (and done row) is the only one it gets.
+        """
+        if bunny._pop is not grid.population:
+            agent.last_state, agent.last_action = s, 5
+            return
+        agent.update_q(s, 5, reward, s_prime)
+        agent.record(s, 5, reward, s_prime)
 
     def update_bunny(self, bunny, grid, turn, logger=None):
         # Determine bunny type and reward function — used in both FSM and RL
         if bunny.is_mutant:
             btype = 'vampire'
             reward_fn = reward_func_vampire
-        elif not bunny.is_adult:
+        elif not bunny.is_adult():
             btype = 'juvenile'
             reward_fn = reward_func_juvenile
         elif bunny.sex == "M":
@@ -193,9 +482,7 @@ class FSMDispatcher:
 
         role = btype
         # Ensure agent exists (used even in FSM mode for training)
-        if bunny.name not in self.rl_agents:
-            self.rl_agents[bunny.name] = BunnyRLAgent(bunny, self.shared_tables[btype])
-        agent = self.rl_agents[bunny.name]
+        agent = self.agent_for(bunny, self.shared_tables[btype])
 
 
         if self.mode == "RL":
@@ -204,7 +491,7 @@ class FSMDispatcher:
             #return reward_fn(bunny, grid), role  # you could capture this inside step() as well
             s_prime = agent.get_state(grid)            
             reward = reward_fn(bunny, grid)
-            agent.update_q(s, 5, reward, s_prime)
+            self._learn(agent, bunny, grid, s, reward, s_prime)
             return reward, role
         #else:
         #    s = agent.get_state(grid)
@@ -222,6 +509,15 @@ class FSMDispatcher:
         #    agent.update_q(s, 5, reward, s_prime)
 #
         #return reward_fn(bunny, grid)
+        elif self.mode == "GNN":
+            # Act on the cached scores; experience is collected as in FSM mode
+            s = agent.get_state(grid)
+            self.gnn_behavior(bunny, agent, grid, turn, logger)
+            s_prime = agent.get_state(grid)
+            reward = reward_fn(bunny, grid)
+            self._learn(agent, bunny, grid, s, reward, s_prime)
+            agent.last_state, agent.last_action = s, 5
+            return reward, role
         else:
             # FSM Mode — still collect RL experience
             s = agent.get_state(grid)
@@ -237,7 +533,8 @@ class FSMDispatcher:
 #            # Update Q-table based on FSM decision as if action 5 was taken
             s_prime = agent.get_state(grid)            
             reward = reward_fn(bunny, grid)
-            agent.update_q(s, 5, reward, s_prime)
+            self._learn(agent, bunny, grid, s, reward, s_prime)
+            agent.last_state, agent.last_action = s, 5
             return reward, role
         
         return 0, None  # Default case, shouldn't happen
@@ -246,6 +543,23 @@ class FSMDispatcher:
 
 
 
+    def gnn_behavior(self, bunny, agent, grid, turn, logger):
+        action = self.gnn_action(bunny, grid)
+        if action is None:
+            return
+        name = GNN_ACTIONS[action]
+        if name == "breed":
+            # The role's own action: infect, birth, seek a female, or flee as a juvenile
+            agent.act(5, grid)
+        elif name == "threat" and not bunny.is_mutant:
+            threats = [b for b in grid.get_adjacent_bunnies(bunny.x, bunny.y) if b.is_mutant]
+            if threats:
+                self.move_away_from_threat(bunny, grid, threats)
+            else:
+                agent.flee_from_vampires(grid)
+        else:
+            bunny.move_random(grid)
+
     def juvenile_behavior(self, bunny, grid, turn, logger):
         
         if any(b.is_mutant for b in grid.get_adjacent_bunnies(bunny.x, bunny.y)):
@@ -277,7 +591,7 @@ class FSMDispatcher:
         neighbors = grid.get_adjacent_bunnies(bunny.x, bunny.y)
         babies = [b for b in neighbors if b.age < 2 and not b.is_mutant]
         vampires = [b for b in neighbors if b.is_mutant]
-        males = [b for b in neighbors if b.sex == 'M' and b.is_adult and not b.is_mutant]
+        males = [b for b in neighbors if b.sex == 'M' and b.is_adult() and not b.is_mutant]
         empty_tiles = grid.get_adjacent_empty_tiles(bunny.x, bunny.y)
 
         if vampires and babies:
@@ -318,7 +632,7 @@ class FSMDispatcher:
 
     def adult_male_behavior(self, bunny, grid, turn, logger):
         neighbors = grid.get_adjacent_bunnies(bunny.x, bunny.y)
-        females = [b for b in neighbors if b.sex == 'F' and b.is_adult and not b.is_mutant]
+        females = [b for b in neighbors if b.sex == 'F' and b.is_adult() and not b.is_mutant]
         has_heat_target = grid.female_heatmap and grid.female_heatmap.best_tile_value() > 1.0
 
         if females:
@@ -355,14 +669,11 @@ class FSMDispatcher:
             if logger:
                 logger.log(turn, "infection", bunny, f"infected {victim.name}")
         else:
-            heatmap = grid.get_bunny_density_map()
             best = None
             best_score = -1
             for dx, dy in grid.get_valid_moves(bunny):
                 nx, ny = bunny.x + dx, bunny.y + dy
-                score = sum(heatmap[i][j]
-                            for i in range(max(0, nx - 2), min(grid.GRID_WIDTH, nx + 3))
-                            for j in range(max(0, ny - 2), min(grid.GRID_HEIGHT, ny + 3)))
+                score = grid.density_around(nx, ny, radius=2)
                 if score > best_score:
                     best_score = score
                     best = (nx, ny)
@@ -394,13 +705,11 @@ class FSMDispatcher:
     #            #move_vampire_toward_cluster(bunny, grid)
 
     def move_away_from_threat(self, bunny, grid, threats):
-        safe_dirs = []
-        for dx, dy in grid.get_adjacent_offsets():
-            nx, ny = bunny.x + dx, bunny.y + dy
-            if grid.in_bounds(nx, ny) and grid.cells[nx][ny] is None:
-                danger = any(abs(nx - t.x) + abs(ny - t.y) <= 1 for t in threats)
-                if not danger:
-                    safe_dirs.append((nx, ny))
+        threat_xy = [(t.x, t.y) for t in threats]
+        safe_dirs = [
+            (nx, ny) for nx, ny in grid.get_adjacent_empty_tiles(bunny.x, bunny.y)
+            if not any(abs(nx - tx) + abs(ny - ty) <= 1 for tx, ty in threat_xy)
+        ]
         if safe_dirs:
             grid.move_bunny(bunny, *random.choice(safe_dirs))
         else:
@@ -1,35 +1,107 @@
 #core/gnn_trainer.py
 
+import random
+from collections import deque
+
 import torch
 import torch.nn.functional as F
+from torch_geometric.data import Data
+from torch_geometric.loader import DataLoader
+
+LABEL_KEYS = ("move", "breed", "threat")
+
+
+class GNNReplayBuffer:
+    """Bounded store of (graph, node index, target) samples for train_gnn_policy.
+
+    Samples keep a reference to their graph, so every sample taken from one
+    turn shares a single Data object, and a graph is freed once its last
+    sample has been pushed out by newer ones.
+    """
+
+    def __init__(self, capacity=50000):
+        self.capacity = capacity
+        self.samples = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, graph, bunny_idx, label):
+        """Store one labeled node; `label` has the LABEL_KEYS entries."""
+        self.samples.append((graph, int(bunny_idx), tuple(float(label[k]) for k in LABEL_KEYS)))
+
+    def add_graph(self, graph, labels):
+        """Store every labeled node of one graph; `labels` maps node index -> label."""
+        for bunny_idx, label in labels.items():
+            self.add(graph, bunny_idx, label)
+
+    def extend(self, samples):
+        """Add old-style sample dicts ({"graph", "label", "bunny_idx"})."""
+        for sample in samples:
+            self.add(sample["graph"], sample["bunny_idx"], sample["label"])
+
+    def sample(self, batch_size):
+        """Random samples without replacement (all of them if there are fewer)."""
+        return random.sample(self.samples, min(batch_size, len(self.samples)))
 
-def train_gnn_policy(gnn, buffer, epochs=2):
-    optimizer = torch.optim.Adam(gnn.parameters(), lr=1e-3)
+
+def group_by_graph(samples):
+    """One Data per distinct graph holding all of its sampled nodes.
+
+    `label_index` is shifted by the node offset when graphs are batched
+    (torch_geometric increments attributes named *index*), so
+    out[batch.label_index] lines up with batch.y.
+    """
+    groups = {}
+    for graph, idx, target in samples:
+        entry = groups.get(id(graph))
+        if entry is None:
+            entry = groups[id(graph)] = (graph, [], [])
+        entry[1].append(idx)
+        entry[2].append(target)
+
+    return [
+        Data(x=graph.x, edge_index=graph.edge_index,
+             label_index=torch.tensor(idxs, dtype=torch.long),
+             y=torch.tensor(targets, dtype=torch.float))
+        for graph, idxs, targets in groups.values()
+    ]
+
+
+def train_gnn_policy(gnn, buffer, epochs=2, batch_size=512, graphs_per_batch=32, lr=1e-3):
+    """Distill expert (FSM/RL) labels into `gnn`.
+
+    Each epoch draws len(buffer) samples in chunks of `batch_size`; the
+    samples of a chunk are grouped per graph and the graphs batched
+    `graphs_per_batch` at a time, so one forward pass covers every labeled
+    node of those graphs. `buffer` is a GNNReplayBuffer or a list of old-style
+    sample dicts.
+    """
+    if not isinstance(buffer, GNNReplayBuffer):
+        samples = list(buffer)
+        buffer = GNNReplayBuffer(capacity=max(1, len(samples)))
+        buffer.extend(samples)
+
+    optimizer = torch.optim.Adam(gnn.parameters(), lr=lr)
     gnn.train()
 
     for epoch in range(epochs):
         total_loss = 0
-        for sample in buffer:
-            graph = sample["graph"]
-            label = sample["label"]
-            idx = sample["bunny_idx"]
-
-            out = gnn(graph)[idx]
+        steps = 0
+        order = buffer.sample(len(buffer))
+        for start in range(0, len(order), batch_size):
+            graphs = group_by_graph(order[start:start + batch_size])
+            for batch in DataLoader(graphs, batch_size=graphs_per_batch, shuffle=False):
+                out = gnn(batch)[batch.label_index]
 
-            # simple supervised loss: match FSM/RL expert behavior
-            target = torch.tensor([
-                label["move"],
-                label["breed"],
-                label["threat"]
-            ], dtype=torch.float)
+                # simple supervised loss: match FSM/RL expert behavior
+                loss = F.mse_loss(out, batch.y)
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.item()
+                steps += 1
 
-            loss = F.mse_loss(out, target)
-            optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
-            total_loss += loss.item()
-
-        print(f"[GNN TRAIN] Epoch {epoch+1} loss: {total_loss:.4f}")
+        print(f"[GNN TRAIN] Epoch {epoch+1} loss: {total_loss / max(1, steps):.4f} ({steps} batches)")
 
     gnn.eval()
-
@@ -1,10 +1,14 @@
 # core/grid.py
 
-import pygame
 import random
+import numpy as np
 from core.bunny import Bunny
+from core.population import Population, BunnyList, ADULT_AGE, SEX_CODES
+from core.layers import VampireField, DensityLayer, OccupancyRaster, NEIGHBOR_OFFSETS
+from core.occupancy import SparseCells, TiledArray
 
 TILE_SIZE = 32
+# Default grid size; pass width/height to Grid for larger maps
 GRID_WIDTH = 20
 GRID_HEIGHT = 15
 SCREEN_WIDTH = TILE_SIZE * GRID_WIDTH
@@ -15,13 +19,33 @@ GRID_COLOR = (60, 60, 60)
 
 
 class Grid:
-    def __init__(self, screen):
+    """The world: occupancy plus the per-cell layers derived from it.
+
+    Occupancy (`cells`) is sparse and grows with the population. The layers
+    (vampire field, density, occupancy raster, female heatmap) are
+    TiledArrays: 64x64 NumPy blocks allocated the first time something
+    happens in them, about 26 bytes per cell of the tiles bunnies have
+    reached. Whole-population queries stay vectorized gathers.
+    """
+
+    def __init__(self, screen=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        # screen is only needed for the draw_* / update methods; headless runs pass None
         self.screen = screen
-        self.bunnies = []
-        self.bunny_map = {}
-        self.cells = [[None for _ in range(GRID_HEIGHT)] for _ in range(GRID_WIDTH)]
+        self.width = width
+        self.height = height
+        self.bunnies = BunnyList()
+        self.population = Population()
+        self.population.on_role_change = self._role_changed
+        # The single source of occupancy; cells[x][y] still works for older callers
+        self.cells = SparseCells(width, height)
+        self._occupied = self.cells.occupied  # (x, y) -> Bunny
+
+        self.layers = []
+        self.vampire_field = self.add_layer(VampireField(self.GRID_WIDTH, self.GRID_HEIGHT))
+        self.density_layer = self.add_layer(DensityLayer(self.GRID_WIDTH, self.GRID_HEIGHT))
+        self.raster = self.add_layer(OccupancyRaster(self.GRID_WIDTH, self.GRID_HEIGHT))
+
         self.spawn_initial_bunnies()
-        self.female_heatmap = FemaleHeatmap(self.GRID_WIDTH, self.GRID_HEIGHT)
         self.total_bunny_births = 0
         self.total_vampire_births = 0
         self.female_heatmap = FemaleHeatmap(self.GRID_WIDTH, self.GRID_HEIGHT)
@@ -32,43 +56,51 @@ class Grid:
         }
         self.last_vampire_turn = 0
 
-              
+
+    # --- Layers (derived per-cell data, see core/layers.py) ---
+
+    def add_layer(self, layer):
+        """Register a GridLayer, replaying the current population into it."""
+        for bunny in self.bunnies:
+            layer.on_place(bunny)
+        self.layers.append(layer)
+        return layer
+
+    def remove_layer(self, layer):
+        if layer in self.layers:
+            self.layers.remove(layer)
+
+    def _role_changed(self, bunny, old_role, new_role):
+        for layer in self.layers:
+            layer.on_role_change(bunny, old_role, new_role)
 
 
     def get_bunny_at(self, x, y):
         """Safe access: return the bunny at (x, y) or None if out-of-bounds or empty."""
         if not self.in_bounds(x, y):
             return None
-        try:
-            return self.cells[y][x]  # [row][col]
-        except IndexError:
-            return None
+        return self._occupied.get((x, y))
 
     
     def is_empty(self, x, y):
-        return self.in_bounds(x, y) and self.cells[x][y] is None
+        return 0 <= x < self.width and 0 <= y < self.height and (x, y) not in self._occupied
 
     def get_valid_moves(self, bunny):
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # Up, down, left, right
-        valid_moves = []
-        for dx, dy in directions:
-            nx, ny = bunny.x + dx, bunny.y + dy
-            if self.in_bounds(nx, ny) and self.get_bunny_at(nx, ny) is None:
-                if self.is_empty(nx, ny):
-                    valid_moves.append((dx, dy))
-
-        return valid_moves
+        x, y = bunny.x, bunny.y
+        return [(dx, dy) for dx, dy in NEIGHBOR_OFFSETS if self.is_empty(x + dx, y + dy)]
 
     def nearest_vampire_distance(self, x, y, radius=5):
         """Return the Manhattan distance to the nearest vampire from (x, y), or None if none found."""
-        min_dist = None
-        for b in self.bunnies:
-            if b.is_mutant:
-                d = abs(b.x - x) + abs(b.y - y)
-                if d <= radius:
-                    if min_dist is None or d < min_dist:
-                        min_dist = d
-        return min_dist
+        if radius <= self.vampire_field.cap and self.in_bounds(x, y):
+            return self.vampire_field.nearest(x, y, radius)
+
+        pop = self.population
+        ids = pop.alive_ids()
+        ids = ids[pop.mutant[ids]]
+        if ids.size == 0:
+            return None
+        d = int((np.abs(pop.x[ids] - x) + np.abs(pop.y[ids] - y)).min())
+        return d if d <= radius else None
     
     def is_vampire_in_range(self, x, y, radius=3):
         return self.nearest_vampire_distance(x, y, radius) is not None
@@ -83,7 +115,7 @@ class Grid:
     
     def in_bounds(self, x, y):
         """Return True if (x, y) is within the grid bounds."""
-        return 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT
+        return 0 <= x < self.width and 0 <= y < self.height
 
 
     def spawn_initial_bunnies(self):
@@ -98,24 +130,30 @@ class Grid:
 
         # Optional: Add 1 juvenile for mutation testing
         jx, jy = random.randint(0, self.GRID_WIDTH - 1), random.randint(0, self.GRID_HEIGHT - 1)
-        if self.cells[jx][jy] is None:
+        if self.is_empty(jx, jy):
             juvenile = Bunny(name="J100", sex=random.choice(['M', 'F']), x=jx, y=jy, age=0)
             self.place_bunny(juvenile, jx, jy)
 
     def place_bunny(self, bunny, x, y):
         if self.is_empty(x, y):
+            bunny.x, bunny.y = x, y
+            self.population.add(bunny)
             self.bunnies.append(bunny)
-            self.cells[x][y] = bunny
-            self.bunny_map[(x, y)] = bunny
+            self._occupied[(x, y)] = bunny
+            for layer in self.layers:
+                layer.on_place(bunny)
 
 
     def move_bunny(self, bunny, new_x, new_y):
-        if self.in_bounds(new_x, new_y) and self.cells[new_x][new_y] is None:
-            self.cells[bunny.x][bunny.y] = None
-            self.bunny_map.pop((bunny.x, bunny.y), None)
-            self.cells[new_x][new_y] = bunny
-            self.bunny_map[(new_x, new_y)] = bunny
+        if bunny._pop is not self.population:
+            return  # not (or no longer) on this grid
+        if self.is_empty(new_x, new_y):
+            old_x, old_y = bunny.x, bunny.y
+            self._occupied.pop((old_x, old_y), None)
+            self._occupied[(new_x, new_y)] = bunny
             bunny.x, bunny.y = new_x, new_y
+            for layer in self.layers:
+                layer.on_move(bunny, old_x, old_y)
 
 
     #def add_bunny(self, bunny):
@@ -125,17 +163,22 @@ class Grid:
 
     def remove_bunny(self, bunny):
         """Remove a bunny from the grid.""" 
-        if bunny in self.bunnies:
-            self.cells[bunny.x][bunny.y] = None
+        if bunny._pop is self.population:
+            self._occupied.pop((bunny.x, bunny.y), None)
             self.bunnies.remove(bunny)
-            self.bunny_map.pop((bunny.x, bunny.y), None)
+            for layer in self.layers:
+                layer.on_remove(bunny)
+            self.population.release(bunny)
 
 
     def get_adjacent_empty_tiles(self, x, y):
+        # Single-bunny path: inline checks beat a NumPy call for four cells;
+        # use empty_neighbor_mask for many bunnies at once
+        occupied, width, height = self._occupied, self.width, self.height
         empty = []
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+        for dx, dy in NEIGHBOR_OFFSETS:
             nx, ny = x + dx, y + dy
-            if self.is_empty(nx, ny):
+            if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in occupied:
                 empty.append((nx, ny))
         return empty
 
@@ -151,31 +194,54 @@ class Grid:
     
     def get_adjacent_bunnies(self, x, y):
         """Return a list of bunnies adjacent to (x, y).""" 
+        # Off-grid cells are never occupied, so no bounds check is needed
+        occupied = self._occupied
         adjacent = []
-        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-            nx, ny = x + dx, y + dy
-            if self.in_bounds(nx, ny):
-                bunny = self.bunny_map.get((nx, ny))
-                if bunny:
-                    adjacent.append(bunny)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            bunny = occupied.get((x + dx, y + dy))
+            if bunny:
+                adjacent.append(bunny)
         return adjacent
 
+    # --- Bulk neighbour queries (one pass for many bunnies) ---
+
+    def empty_neighbor_mask(self, ids):
+        """(N, 4) free-neighbour mask, in NEIGHBOR_OFFSETS order, for population ids."""
+        pop = self.population
+        return self.raster.empty_mask(pop.x[ids], pop.y[ids])
+
+    def adjacent_role_counts(self, ids, *roles):
+        """Neighbours with one of the ROLE_* codes `roles`, for each population id."""
+        pop = self.population
+        return self.raster.count_adjacent(pop.x[ids], pop.y[ids], *roles)
+
+    def adjacent_adults(self, ids, sex):
+        """Whether each bunny has an adult neighbour of `sex` ('M'/'F'), vampires included."""
+        pop = self.population
+        nb = self.raster.neighbor_ids(pop.x[ids], pop.y[ids])
+        occupied = nb >= 0
+        nb = np.where(occupied, nb, 0)
+        match = occupied & (pop.sex[nb] == SEX_CODES[sex]) & (pop.age[nb] >= ADULT_AGE)
+        return match.any(axis=1)
+
     
     def move_toward(self, bunny, tx, ty):
         dx = 1 if tx > bunny.x else -1 if tx < bunny.x else 0
         dy = 1 if ty > bunny.y else -1 if ty < bunny.y else 0
         options = [(bunny.x + dx, bunny.y), (bunny.x, bunny.y + dy)]
         for nx, ny in options:
-            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and self.cells[nx][ny] is None:
+            if self.is_empty(nx, ny):
                 self.move_bunny(bunny, nx, ny)
                 return
         bunny.move_random(self)  # fallback
 
     def draw_grid(self):
-        for x in range(0, SCREEN_WIDTH, TILE_SIZE):
-            pygame.draw.line(self.screen, GRID_COLOR, (x, 0), (x, SCREEN_HEIGHT))
-        for y in range(0, SCREEN_HEIGHT, TILE_SIZE):
-            pygame.draw.line(self.screen, GRID_COLOR, (0, y), (SCREEN_WIDTH, y))
+        import pygame
+        screen_width, screen_height = self.screen_size
+        for x in range(0, screen_width, TILE_SIZE):
+            pygame.draw.line(self.screen, GRID_COLOR, (x, 0), (x, screen_height))
+        for y in range(0, screen_height, TILE_SIZE):
+            pygame.draw.line(self.screen, GRID_COLOR, (0, y), (screen_width, y))
 
     def draw_entities(self):
         for bunny in self.bunnies:
@@ -185,12 +251,9 @@ class Grid:
 
     def update(self):
         """Update the grid display."""
-        # Clear the screen
+        import pygame
+        # Full redraw; core.renderer.PygameRenderer only redraws changed tiles
         self.screen.fill(BG_COLOR)
-        for bunny in self.bunnies:
-            px = bunny.x * TILE_SIZE
-            py = bunny.y * TILE_SIZE
-            bunny.draw(self.screen, px, py)
         
         ## track colony bonuses
         #population_size = len(self.bunnies)
@@ -218,20 +281,25 @@ class Grid:
     #    return list(self.bunnies)
 
     def get_bunny_density_map(self):
-        heatmap = [[0 for _ in range(GRID_HEIGHT)] for _ in range(GRID_WIDTH)]
-        for bunny in self.bunnies:
-            if not bunny.is_mutant:
-                heatmap[bunny.x][bunny.y] += 1
-        return heatmap
+        """Non-vampire bunnies per cell, indexed [x][y], as a dense copy."""
+        return self.density_layer.density.to_dense()
+
+    def density_around(self, x, y, radius=2):
+        """Number of non-vampire bunnies in the square window of `radius` around (x, y)."""
+        return self.density_layer.window_sum(x - radius, x + radius + 1, y - radius, y + radius + 1)
 
 
     @property
     def GRID_WIDTH(self):
-        return GRID_WIDTH
+        return self.width
 
     @property
     def GRID_HEIGHT(self):
-        return GRID_HEIGHT
+        return self.height
+
+    @property
+    def screen_size(self):
+        return self.width * TILE_SIZE, self.height * TILE_SIZE
     
     @property
     def TILE_SIZE(self):
@@ -239,27 +307,91 @@ class Grid:
 
 # --- Female Heatmap for Mating Strategy ---
 
+class _HeatRow:
+    __slots__ = ("heatmap", "x")
+
+    def __init__(self, heatmap, x):
+        self.heatmap = heatmap
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.heatmap.value(self.x, y)
+
+
+class _HeatView:
+    """Read-only `data[x][y]` access to the decayed heat values."""
+    __slots__ = ("heatmap",)
+
+    def __init__(self, heatmap):
+        self.heatmap = heatmap
+
+    def __getitem__(self, x):
+        return _HeatRow(self.heatmap, x)
+
+
 class FemaleHeatmap:
+    """Decaying map of where adult females have been seen.
+
+    Decay is lazy: the stored values are scaled by a single factor instead of
+    multiplying every cell each turn. Since decay scales every cell equally and
+    sightings only add heat, the best tile is maintained incrementally and
+    best_tile() is O(1). Only tiles with a sighting are stored.
+    """
+
+    DECAY = 0.95
+    MIN_SCALE = 1e-100  # fold the scale back into the array before it underflows
+
     def __init__(self, width, height):
         self.width = width
         self.height = height
-        self.data = [[0.0 for _ in range(height)] for _ in range(width)]
+        self._raw = TiledArray(width, height, np.float64)
+        self._scale = 1.0
+        self._best = (0, 0)
+        self.data = _HeatView(self)
+
+    def value(self, x, y):
+        return self._raw.item(x, y) * self._scale
 
     def decay(self):
-        for x in range(self.width):
-            for y in range(self.height):
-                self.data[x][y] *= 0.95
+        self._scale *= self.DECAY
+        if self._scale < self.MIN_SCALE:
+            self._raw.scale(self._scale)
+            self._scale = 1.0
+            self._best = self._raw.argmax()
+
+    def add_sightings(self, xs, ys):
+        """Add one unit of heat at each (xs[i], ys[i])."""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        if xs.size == 0:
+            return
+        self._raw.add_at(xs, ys, 1.0 / self._scale)
+
+        # Only the touched cells can overtake the current best; ties go to the
+        # first cell in x-major order, as with a flat scan.
+        flat = np.unique(xs * self.height + ys)
+        values = self._raw[flat // self.height, flat % self.height]
+        top = values.max()
+        candidate = int(flat[values == top].min())
+        bx, by = self._best
+        best_value = self._raw.item(bx, by)
+        if top > best_value or (top == best_value and candidate < bx * self.height + by):
+            self._best = (candidate // self.height, candidate % self.height)
 
     def update_from_sightings(self, bunnies):
-        for b in bunnies:
-            if b.sex == 'F' and b.is_adult() and not b.is_mutant:
-                self.data[b.x][b.y] += 1.0
+        females = [b for b in bunnies if b.sex == 'F' and b.is_adult() and not b.is_mutant]
+        self.add_sightings([b.x for b in females], [b.y for b in females])
 
-    def best_tile(self):
-        flat = [((x, y), self.data[x][y]) for x in range(self.width) for y in range(self.height)]
-        return max(flat, key=lambda kv: kv[1])[0]
+    def update_from_population(self, population):
+        """Same as update_from_sightings, selecting adult females column-wise."""
+        self.add_sightings(*population.adult_female_positions())
 
+    def values_at(self, xs, ys):
+        return self._raw[xs, ys] * self._scale
+
+    def best_tile(self):
+        return (int(self._best[0]), int(self._best[1]))
 
     def best_tile_value(self):
-        x, y = self.best_tile()
-        return self.data[x][y]
+        x, y = self._best
+        return self.value(x, y)
@@ -1,30 +1,160 @@
 # core/grid_env.py
 
+import random
 import gym
 from gym import spaces
 import numpy as np
 
+from core.bunny import Bunny
+from core.grid import Grid
+from core.fsm_dispatcher import FSMDispatcher, ROLE_REWARDS
+from core.simulation import Simulation
+from core.trainer import load_shared_tables
+
+# Action -> (dx, dy)
+ENV_MOVES = ((0, 0), (0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def _role(bunny):
+    # Works on bunnies that already left the grid, unlike Population.role_of
+    if bunny.is_mutant:
+        return "vampire"
+    if not bunny.is_adult():
+        return "juvenile"
+    return "male" if bunny.sex == "M" else "female"
+
+
 class BunnyEnv(gym.Env):
-    def __init__(self, grid_size=80):
+    """One headless world where the action moves a single focal bunny.
+
+    Every other bunny is run by an FSMDispatcher in `mode`. A step is one
+    simulation turn and the reward is the focal bunny's role reward after
+    the turn, death penalty included. Bunnies live at most MAX_AGE turns,
+    so the focal bunny starts as a newborn next to the colony and, with
+    `respawn`, a new one takes its place when it dies (info["agent_died"]).
+    The episode ends when the colony dies out, after `max_turns` turns, or
+    without `respawn` when the focal bunny dies.
+    """
+
+    def __init__(self, grid_size=80, mode="FSM", max_turns=1000, seed=None, shared_tables=None, respawn=True):
         super().__init__()
         self.grid_size = grid_size
+        self.mode = mode
+        self.max_turns = max_turns
+        self.respawn = respawn
         self.observation_space = spaces.Box(low=0, high=5, shape=(grid_size, grid_size), dtype=np.int8)
         self.action_space = spaces.Discrete(5)  # 0=Stay, 1=Up, 2=Down, 3=Left, 4=Right
 
-    def reset(self):
+        # Loaded once; every episode keeps training the same role tables
+        self.shared_tables = shared_tables if shared_tables is not None else load_shared_tables()
+        self._seed = seed
+        self.sim = None
+        self.agent = None
+
+    def reset(self, seed=None):
         # Reset simulation state
+        if seed is not None:
+            self._seed = seed
+        if self._seed is not None:
+            random.seed(self._seed)
+            self._seed += 1  # the next reset gets a new, still reproducible world
+        grid = Grid(width=self.grid_size, height=self.grid_size)
+        dispatcher = FSMDispatcher(mode=self.mode, shared_tables=self.shared_tables)
+        self.sim = Simulation(grid=grid, dispatcher=dispatcher)
+        self.agent = self._spawn_agent()
         return self._get_observation()
 
-    def step(self, action):
-        # Apply action to an agent
-        reward = 0
-        done = False
-        info = {}
-        return self._get_observation(), reward, done, info
+    def _spawn_agent(self):
+        """Place a newborn focal bunny next to a random bunny, or anywhere free if none has room."""
+        grid = self.sim.grid
+        for bunny in random.sample(list(grid.bunnies), len(grid.bunnies)):
+            tiles = grid.get_adjacent_empty_tiles(bunny.x, bunny.y)
+            if tiles:
+                x, y = random.choice(tiles)
+                break
+        else:
+            free = [(x, y) for x in range(grid.width) for y in range(grid.height) if grid.is_empty(x, y)]
+            if not free:
+                return None
+            x, y = random.choice(free)
+        agent = Bunny(name="Agent", sex=random.choice("MF"), x=x, y=y, age=0)
+        agent.controlled = True
+        grid.place_bunny(agent, x, y)
+        return agent
+
+    def step(self, action, observe=True):
+        # Apply action to an agent; observe=False skips the observation copy (see observe)
+        grid = self.sim.grid
+        agent = self.agent
+        dx, dy = ENV_MOVES[int(action)]
+        if dx or dy:
+            grid.move_bunny(agent, agent.x + dx, agent.y + dy)
+
+        alive = self.sim.step()
+        died = agent._pop is not grid.population
+        reward = float(ROLE_REWARDS[_role(agent)](agent, grid))
+        done = not alive or self.sim.turn >= self.max_turns
+        if died:
+            if self.respawn and not done:
+                self.agent = self._spawn_agent()
+            done = done or self.agent is None or not self.respawn
+        info = {"turn": self.sim.turn, "population": len(grid.bunnies), "agent_died": died}
+        return self._get_observation() if observe else None, reward, done, info
 
     def _get_observation(self):
         # Return grid state as matrix of encoded bunny types
-        obs = np.zeros((self.grid_size, self.grid_size), dtype=np.int8)
-        # Example: 0=empty, 1=juvenile, 2=male, 3=female, 4=mutant
-        return obs
+        # 0=empty, 1=juvenile, 2=male, 3=female, 4=mutant
+        return self.observe()
+
+    def observe(self, out=None):
+        """Copy the grid's live observation raster into `out` (or a new array)."""
+        return self.sim.grid.raster.codes.to_dense(out)
+
+
+class VecBunnyEnv:
+    """K independent BunnyEnvs stepped together in one process.
+
+    reset() and step() return stacked arrays: observations (K, size, size)
+    int8, rewards (K,) float32 and dones (K,) bool. A finished world is reset
+    right away; its last observation is kept in infos[k]["terminal_observation"].
+    """
+
+    def __init__(self, num_envs, grid_size=80, mode="FSM", max_turns=1000, seed=None, shared_tables=None,
+                 respawn=True):
+        shared_tables = shared_tables if shared_tables is not None else load_shared_tables()
+        # Seeds far apart so the worlds never replay each other's episodes
+        self.envs = [
+            BunnyEnv(grid_size=grid_size, mode=mode, max_turns=max_turns,
+                     seed=None if seed is None else seed + k * 1000003, shared_tables=shared_tables,
+                     respawn=respawn)
+            for k in range(num_envs)
+        ]
+        self.num_envs = num_envs
+        self.observation_space = self.envs[0].observation_space
+        self.action_space = self.envs[0].action_space
+        self._obs = np.zeros((num_envs, grid_size, grid_size), dtype=np.int8)
+        self._rewards = np.zeros(num_envs, dtype=np.float32)
+        self._dones = np.zeros(num_envs, dtype=bool)
+
+    def reset(self):
+        for k, env in enumerate(self.envs):
+            env.reset()
+            env.observe(self._obs[k])
+        return self._obs.copy()
+
+    def step(self, actions):
+        infos = []
+        for k, (env, action) in enumerate(zip(self.envs, actions)):
+            _, reward, done, info = env.step(action, observe=False)
+            if done:
+                info["terminal_observation"] = env.observe()
+                env.reset()
+            env.observe(self._obs[k])
+            self._rewards[k] = reward
+            self._dones[k] = done
+            infos.append(info)
+        return self._obs.copy(), self._rewards.copy(), self._dones.copy(), infos
 
+    def close(self):
+        for env in self.envs:
+            env.close()
@@ -0,0 +1,255 @@
+# core/layers.py
+#
+# Grid layers: derived per-cell data kept in sync with the grid as bunnies are
+# placed, moved, removed or change role. A layer registers with Grid.add_layer()
+# and implements any of on_place / on_move / on_remove / on_role_change.
+
+import numpy as np
+from core.occupancy import TiledArray, TILE_SHIFT, TILE
+from core.population import ROLE_VAMPIRE
+
+
+class GridLayer:
+    """Base class with no-op hooks; subclasses override what they need."""
+
+    def on_place(self, bunny):
+        pass
+
+    def on_move(self, bunny, old_x, old_y):
+        pass
+
+    def on_remove(self, bunny):
+        pass
+
+    def on_role_change(self, bunny, old_role, new_role):
+        pass
+
+
+class VampireField(GridLayer):
+    """Manhattan distance from every cell to the nearest vampire, capped at `cap`.
+
+    Adding a vampire lowers the distances in its (2*cap+1)^2 window; removing
+    one recomputes that window from the vampires within 2*cap of it. Both are
+    small fixed-size NumPy operations, so every "distance to nearest vampire"
+    or "vampire within r" query (r <= cap) is a single array lookup. Both
+    arrays are tiled: only tiles within `cap` of a vampire are ever stored.
+    """
+
+    def __init__(self, width, height, cap=8):
+        self.width = width
+        self.height = height
+        self.cap = cap
+        self.far = cap + 1  # stored for cells with no vampire within cap
+        self.dist = TiledArray(width, height, np.int16, fill=self.far)
+        self.vampires = TiledArray(width, height, np.int16)  # vampires per cell
+        offsets = np.arange(-cap, cap + 1)
+        self._kernel = (np.abs(offsets)[:, None] + np.abs(offsets)[None, :]).astype(np.int16)
+
+    def _window(self, x, y, r):
+        x0, x1 = max(0, x - r), min(self.width, x + r + 1)
+        y0, y1 = max(0, y - r), min(self.height, y + r + 1)
+        return x0, x1, y0, y1
+
+    def add(self, x, y):
+        self.vampires.add(x, y, 1)
+        x0, x1, y0, y1 = self._window(x, y, self.cap)
+        c = self.cap
+        kernel = self._kernel[x0 - x + c:x1 - x + c, y0 - y + c:y1 - y + c]
+        self.dist.set_window(x0, x1, y0, y1, np.minimum(self.dist.window(x0, x1, y0, y1), kernel))
+
+    def remove(self, x, y):
+        self.vampires.add(x, y, -1)
+        x0, x1, y0, y1 = self._window(x, y, self.cap)
+        sx0, sx1, sy0, sy1 = self._window(x, y, 2 * self.cap)
+        vx, vy = np.nonzero(self.vampires.window(sx0, sx1, sy0, sy1))
+        window = np.full((x1 - x0, y1 - y0), self.far, dtype=np.int16)
+        if vx.size:
+            cx = np.arange(x0, x1)[:, None, None]
+            cy = np.arange(y0, y1)[None, :, None]
+            d = np.abs(cx - (vx + sx0)) + np.abs(cy - (vy + sy0))
+            np.minimum(window, d.min(axis=2), out=window)
+        self.dist.set_window(x0, x1, y0, y1, window)
+
+    def nearest(self, x, y, radius):
+        """Distance to the nearest vampire if it is within `radius`, else None."""
+        d = self.dist.item(x, y)
+        return d if d <= radius else None
+
+    # --- GridLayer hooks ---
+
+    def on_place(self, bunny):
+        if bunny.is_mutant:
+            self.add(bunny.x, bunny.y)
+
+    def on_move(self, bunny, old_x, old_y):
+        if bunny.is_mutant:
+            self.remove(old_x, old_y)
+            self.add(bunny.x, bunny.y)
+
+    def on_remove(self, bunny):
+        if bunny.is_mutant:
+            self.remove(bunny.x, bunny.y)
+
+    def on_role_change(self, bunny, old_role, new_role):
+        if new_role == ROLE_VAMPIRE and old_role != ROLE_VAMPIRE:
+            self.add(bunny.x, bunny.y)
+        elif old_role == ROLE_VAMPIRE and new_role != ROLE_VAMPIRE:
+            self.remove(bunny.x, bunny.y)
+
+
+class DensityLayer(GridLayer):
+    """Count of non-vampire bunnies per cell, with cheap window sums.
+
+    `density` is a TiledArray updated in place on every grid change. Each
+    allocated tile gets its own summed-area table, built the first time a
+    window sum touches the tile after it changed, so a query costs one or a
+    few table lookups and a grid that is never queried never builds any.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.density = TiledArray(width, height, np.int32)
+        self._sats = {}      # (tx, ty) -> (TILE+1, TILE+1) summed-area table of that tile
+        self._dirty = set()  # tiles changed since their table was built
+
+    def _change(self, x, y, delta):
+        self.density.add(x, y, delta)
+        self._dirty.add((x >> TILE_SHIFT, y >> TILE_SHIFT))
+
+    def _sat(self, tx, ty, block):
+        sat = self._sats.get((tx, ty))
+        if sat is None or (tx, ty) in self._dirty:
+            if sat is None:
+                sat = self._sats[(tx, ty)] = np.zeros((TILE + 1, TILE + 1), dtype=np.int32)
+            np.cumsum(block, axis=0, out=sat[1:, 1:])
+            np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+            self._dirty.discard((tx, ty))
+        return sat
+
+    def window_sum(self, x0, x1, y0, y1):
+        """Sum of density over [x0, x1) x [y0, y1), clipped to the grid."""
+        x0, x1 = max(0, x0), min(self.width, x1)
+        y0, y1 = max(0, y0), min(self.height, y1)
+        if x0 >= x1 or y0 >= y1:
+            return 0
+        total = 0
+        for tx in range(x0 >> TILE_SHIFT, ((x1 - 1) >> TILE_SHIFT) + 1):
+            bx = tx * TILE
+            lx0, lx1 = max(x0 - bx, 0), min(x1 - bx, TILE)
+            for ty in range(y0 >> TILE_SHIFT, ((y1 - 1) >> TILE_SHIFT) + 1):
+                block = self.density.block(tx, ty)
+                if block is None:
+                    continue  # never written: all zero
+                by = ty * TILE
+                ly0, ly1 = max(y0 - by, 0), min(y1 - by, TILE)
+                sat = self._sat(tx, ty, block)
+                total += sat.item(lx1, ly1) - sat.item(lx0, ly1) - sat.item(lx1, ly0) + sat.item(lx0, ly0)
+        return total
+
+    # --- GridLayer hooks ---
+
+    def on_place(self, bunny):
+        if not bunny.is_mutant:
+            self._change(bunny.x, bunny.y, 1)
+
+    def on_move(self, bunny, old_x, old_y):
+        if not bunny.is_mutant:
+            self._change(old_x, old_y, -1)
+            self._change(bunny.x, bunny.y, 1)
+
+    def on_remove(self, bunny):
+        if not bunny.is_mutant:
+            self._change(bunny.x, bunny.y, -1)
+
+    def on_role_change(self, bunny, old_role, new_role):
+        if new_role == ROLE_VAMPIRE and old_role != ROLE_VAMPIRE:
+            self._change(bunny.x, bunny.y, -1)
+        elif old_role == ROLE_VAMPIRE and new_role != ROLE_VAMPIRE:
+            self._change(bunny.x, bunny.y, 1)
+
+
+# Neighbour order shared by every bulk query; matches Grid.get_adjacent_bunnies
+NEIGHBOR_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+EMPTY = -1
+OFF_GRID = -2
+
+
+class OccupancyRaster(GridLayer):
+    """Bunny id and role bit per cell, for whole-population neighbour queries.
+
+    `ids` holds the population id of the bunny on each cell (EMPTY if none)
+    and `roles` has bit (1 << role) set for its ROLE_* code. Both are
+    TiledArrays, so only tiles a bunny has stood on are stored, and the
+    four neighbours of any set of positions are one gathered lookup
+    (OFF_GRID / 0 past the edges).
+
+    `codes` is the int8 observation encoding of the same cells: 0 empty,
+    1 juvenile, 2 male, 3 female, 4 mutant (ROLE_* + 1). It is always current,
+    so observations are copies of it rather than rebuilt arrays.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ids = TiledArray(width, height, np.int32, fill=EMPTY)
+        self.roles = TiledArray(width, height, np.uint8)
+        self.codes = TiledArray(width, height, np.int8)
+        self._dx = np.array([dx for dx, _ in NEIGHBOR_OFFSETS], dtype=np.intp)
+        self._dy = np.array([dy for _, dy in NEIGHBOR_OFFSETS], dtype=np.intp)
+
+    def _neighbors(self, raster, xs, ys, outside):
+        xs = np.asarray(xs, dtype=np.intp)[:, None]
+        ys = np.asarray(ys, dtype=np.intp)[:, None]
+        return raster.take(xs + self._dx, ys + self._dy, outside)
+
+    def neighbor_ids(self, xs, ys):
+        """(N, 4) ids around each position: a bunny id, EMPTY or OFF_GRID."""
+        return self._neighbors(self.ids, xs, ys, OFF_GRID)
+
+    def neighbor_roles(self, xs, ys):
+        """(N, 4) role bits around each position (0 for empty or off-grid)."""
+        return self._neighbors(self.roles, xs, ys, 0)
+
+    def empty_mask(self, xs, ys):
+        """(N, 4) True where the neighbour cell is on the grid and free."""
+        return self.neighbor_ids(xs, ys) == EMPTY
+
+    def count_adjacent(self, xs, ys, *roles):
+        """Number of neighbours of each position whose role is one of `roles`."""
+        bits = 0
+        for role in roles:
+            bits |= 1 << role
+        return np.count_nonzero(self.neighbor_roles(xs, ys) & bits, axis=1)
+
+    def tile_keys(self, population):
+        """codes * 2, plus the sex bit on juvenile cells: one key per distinct look."""
+        keys = self.codes.to_dense() * 2
+        jx, jy = np.nonzero(keys == 2)
+        if jx.size:
+            keys[jx, jy] += population.sex[self.ids[jx, jy]]
+        return keys
+
+    # --- GridLayer hooks ---
+
+    def on_place(self, bunny):
+        role = bunny._pop.role_of(bunny.id)
+        self.ids.set(bunny.x, bunny.y, bunny.id)
+        self.roles.set(bunny.x, bunny.y, 1 << role)
+        self.codes.set(bunny.x, bunny.y, role + 1)
+
+    def on_move(self, bunny, old_x, old_y):
+        x, y = bunny.x, bunny.y
+        self.ids.move(old_x, old_y, x, y)
+        self.roles.move(old_x, old_y, x, y)
+        self.codes.move(old_x, old_y, x, y)
+
+    def on_remove(self, bunny):
+        self.ids.set(bunny.x, bunny.y, EMPTY)
+        self.roles.set(bunny.x, bunny.y, 0)
+        self.codes.set(bunny.x, bunny.y, 0)
+
+    def on_role_change(self, bunny, old_role, new_role):
+        self.roles.set(bunny.x, bunny.y, 1 << new_role)
+        self.codes.set(bunny.x, bunny.y, new_role + 1)
@@ -1,28 +1,183 @@
 # core/logger.py
+import atexit
 import os
 import csv
+import queue
+import threading
 from datetime import datetime
 
+import numpy as np
+
+COLUMNS = ["turn", "event_type", "bunny_name", "age", "location", "details", "controller"]
+
+
 class EventLogger:
-    def __init__(self, log_dir="data/logs"):
+    """Buffered event log.
+
+    log() only appends a tuple to an in-memory buffer. The buffer is written
+    out in batches: when it reaches `flush_every` rows, at every end_turn(),
+    and on close(). With background=True the formatting and writing happen on
+    a writer thread; at most `max_pending` batches wait for it, after which
+    the simulation blocks until it catches up. An error in the writer is
+    raised by the next flush(), end_turn() or close().
+
+    close() also runs at interpreter exit, and the logger is a context
+    manager (`with EventLogger() as logger: ...`).
+
+    fmt="csv" writes the usual CSV. fmt="npy" writes each batch as a NumPy
+    structured array appended to one file (read it back with
+    read_event_chunks). Output rotates to a new numbered file once it passes
+    `rotate_bytes`, or every `rotate_turns` turns.
+    """
+
+    def __init__(self, log_dir="data/logs", fmt="csv", flush_every=4096, background=False,
+                 rotate_bytes=None, rotate_turns=None, max_pending=64):
+        if fmt not in ("csv", "npy"):
+            raise ValueError(f"Unknown log format: {fmt}")
         os.makedirs(log_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.path = os.path.join(log_dir, f"log_{timestamp}.csv")
-        self.file = open(self.path, "w", newline="")
-        self.writer = csv.writer(self.file)
-        self.writer.writerow(["turn", "event_type", "bunny_name", "age", "location", "details", "controller"])
+        self.base_path = os.path.join(log_dir, f"log_{timestamp}")
+        self.fmt = fmt
+        self.flush_every = flush_every
+        self.rotate_bytes = rotate_bytes
+        self.rotate_turns = rotate_turns
+
+        self.part = 0
+        self.path = None
+        self.file = None
+        self.writer = None
+        self._file_turn = 0
+        self._open_part()
+
+        self._buffer = []
+        self._queue = None
+        self._thread = None
+        self._error = None
+        if background:
+            self._queue = queue.Queue(maxsize=max_pending)
+            self._thread = threading.Thread(target=self._run_writer, name="EventLogger", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- producer side (simulation thread) ---
 
     def log(self, turn, event_type, bunny, detail, controller="FSM"):
-        self.writer.writerow([
-            turn,
-            event_type,
-            bunny.name,
-            bunny.age,
-            f"({bunny.x},{bunny.y})",
-            detail,
-            controller
-        ])
-        self.file.flush()
+        self._buffer.append((turn, event_type, bunny.name, bunny.age, bunny.x, bunny.y, detail, controller))
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def end_turn(self, turn):
+        """Turn boundary: write out the turn's events and rotate if due."""
+        self.flush()
+        if self.rotate_turns and turn - self._file_turn >= self.rotate_turns:
+            self._file_turn = turn
+            self._submit(("rotate", None))
+
+    def flush(self):
+        self._raise_error()
+        if self._buffer:
+            rows, self._buffer = self._buffer, []
+            self._submit(("rows", rows))
 
     def close(self):
+        if self.file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            atexit.unregister(self.close)
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+            self.file.close()
+            self.file = None
+        self._raise_error()
+
+    def _raise_error(self):
+        # Hand a writer thread exception to the simulation thread, once
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _submit(self, item):
+        if self._queue is not None:
+            self._queue.put(item)
+        else:
+            self._handle(item)
+
+    # --- writer side ---
+
+    def _run_writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks on a dead writer
+            try:
+                self._handle(item)
+            except Exception as error:
+                self._error = error
+
+    def _handle(self, item):
+        kind, rows = item
+        if kind == "rotate":
+            self._rotate()
+            return
+        if self.fmt == "csv":
+            self.writer.writerows(
+                (turn, event_type, name, age, f"({x},{y})", detail, controller)
+                for turn, event_type, name, age, x, y, detail, controller in rows
+            )
+        else:
+            np.save(self.file, events_to_array(rows))
+        self.file.flush()
+        if self.rotate_bytes and self.file.tell() >= self.rotate_bytes:
+            self._rotate()
+
+    def _open_part(self):
+        suffix = f"_{self.part:03d}" if self.part else ""
+        self.path = f"{self.base_path}{suffix}.{self.fmt}"
+        if self.fmt == "csv":
+            self.file = open(self.path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+        else:
+            self.file = open(self.path, "wb")
+
+    def _rotate(self):
         self.file.close()
+        self.part += 1
+        self._open_part()
+
+
+def events_to_array(rows):
+    """Pack buffered event tuples into a NumPy structured array."""
+    turns, event_types, names, ages, xs, ys, details, controllers = zip(*rows)
+    details = [str(d) for d in details]
+
+    def text(values):
+        return f"U{max(1, max(len(v) for v in values))}"
+
+    dtype = [
+        ("turn", "i4"), ("event_type", text(event_types)), ("bunny_name", text(names)),
+        ("age", "i4"), ("x", "i4"), ("y", "i4"),
+        ("details", text(details)), ("controller", text(controllers)),
+    ]
+    return np.array(list(zip(turns, event_types, names, ages, xs, ys, details, controllers)), dtype=dtype)
+
+
+def read_event_chunks(path):
+    """Yield the structured-array chunks of an .npy event log in order."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            yield np.load(f)
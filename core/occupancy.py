@@ -0,0 +1,246 @@
+# core/occupancy.py
+
+import numpy as np
+
+
+class _CellColumn:
+    __slots__ = ("cells", "x")
+
+    def __init__(self, cells, x):
+        self.cells = cells
+        self.x = x
+
+    def __getitem__(self, y):
+        return self.cells.occupied.get((self.x, y))
+
+    def __setitem__(self, y, bunny):
+        self.cells.set(self.x, y, bunny)
+
+
+class SparseCells:
+    """Sparse cell occupancy: only occupied cells are stored.
+
+    The occupancy map itself follows the population instead of the grid
+    area: a 2000x2000 map with a few thousand bunnies costs a few thousand
+    dict entries. The Grid's per-cell layers are TiledArrays (below).
+    `cells[x][y]` reads and writes still work for older callers.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.occupied = {}  # (x, y) -> Bunny
+
+    def __len__(self):
+        return len(self.occupied)
+
+    def __getitem__(self, x):
+        return _CellColumn(self, x)
+
+    def get(self, x, y):
+        return self.occupied.get((x, y))
+
+    def set(self, x, y, bunny):
+        if bunny is None:
+            self.occupied.pop((x, y), None)
+        else:
+            self.occupied[(x, y)] = bunny
+
+
+TILE_SHIFT = 6
+TILE = 1 << TILE_SHIFT      # tiles are TILE x TILE cells
+_TILE_MASK = TILE - 1
+
+
+class TiledArray:
+    """A width x height array stored as TILE x TILE blocks allocated on first write.
+
+    Cells of tiles that were never written read as `fill`, so memory follows
+    the parts of the grid bunnies have reached instead of its area. Indexing
+    with `[x, y]` takes ints or (broadcast) integer arrays like a 2-D NumPy
+    array, but always returns copies; writing `fill` into a tile that was
+    never allocated does not allocate it.
+    """
+
+    def __init__(self, width, height, dtype, fill=0):
+        self.width = width
+        self.height = height
+        self.dtype = np.dtype(dtype)
+        self.fill = fill
+        # Block slot of every tile; slot 0 is the shared, never written fill block
+        self._index = np.zeros(((width + _TILE_MASK) >> TILE_SHIFT, (height + _TILE_MASK) >> TILE_SHIFT),
+                               dtype=np.intp)
+        self._blocks = np.full((4, TILE, TILE), fill, dtype=self.dtype)
+        self._n = 1
+
+    @property
+    def tiles(self):
+        """Number of allocated tiles."""
+        return self._n - 1
+
+    @property
+    def nbytes(self):
+        return self._blocks.nbytes + self._index.nbytes
+
+    def _allocate(self, tx, ty):
+        if self._n == len(self._blocks):
+            blocks = np.full((2 * len(self._blocks), TILE, TILE), self.fill, dtype=self.dtype)
+            blocks[:self._n] = self._blocks[:self._n]
+            self._blocks = blocks
+        slot = self._n
+        self._index[tx, ty] = slot
+        self._n += 1
+        return slot
+
+    def block(self, tx, ty):
+        """Live TILE x TILE view of tile (tx, ty), or None if it was never written."""
+        slot = self._index.item(tx, ty)
+        return self._blocks[slot] if slot else None
+
+    def allocated(self):
+        """(tx, ty, block) for every allocated tile; blocks are live views."""
+        for tx, ty in zip(*np.nonzero(self._index)):
+            yield int(tx), int(ty), self._blocks[self._index[tx, ty]]
+
+    def item(self, x, y):
+        return self._blocks.item(self._index.item(x >> TILE_SHIFT, y >> TILE_SHIFT), x & _TILE_MASK, y & _TILE_MASK)
+
+    def set(self, x, y, value):
+        """Write one cell; the scalar fast path of self[x, y] = value."""
+        slot = self._index.item(x >> TILE_SHIFT, y >> TILE_SHIFT)
+        if slot == 0:
+            if value == self.fill:
+                return
+            slot = self._allocate(x >> TILE_SHIFT, y >> TILE_SHIFT)
+        self._blocks[slot, x & _TILE_MASK, y & _TILE_MASK] = value
+
+    def move(self, old_x, old_y, x, y):
+        """Move one cell's value to (x, y), leaving fill behind."""
+        slot = self._index.item(old_x >> TILE_SHIFT, old_y >> TILE_SHIFT)
+        lx, ly = old_x & _TILE_MASK, old_y & _TILE_MASK
+        value = self._blocks.item(slot, lx, ly)
+        if slot:
+            self._blocks[slot, lx, ly] = self.fill
+        self.set(x, y, value)
+
+    def __getitem__(self, key):
+        x, y = key
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            return self.item(int(x), int(y))
+        xs = np.asarray(x, dtype=np.intp)
+        ys = np.asarray(y, dtype=np.intp)
+        return self._blocks[self._index[xs >> TILE_SHIFT, ys >> TILE_SHIFT], xs & _TILE_MASK, ys & _TILE_MASK]
+
+    def __setitem__(self, key, value):
+        x, y = key
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            self.set(int(x), int(y), value)
+            return
+        xs, ys, values = np.broadcast_arrays(np.asarray(x, dtype=np.intp), np.asarray(y, dtype=np.intp),
+                                             np.asarray(value, dtype=self.dtype))
+        tx, ty = xs >> TILE_SHIFT, ys >> TILE_SHIFT
+        slots = self._index[tx, ty]
+        unallocated = slots == 0
+        if unallocated.any():
+            needed = unallocated & (values != self.fill)
+            for key in set(zip(tx[needed].tolist(), ty[needed].tolist())):
+                self._allocate(*key)
+            slots = self._index[tx, ty]
+            keep = slots != 0
+            xs, ys, slots, values = xs[keep], ys[keep], slots[keep], values[keep]
+        self._blocks[slots, xs & _TILE_MASK, ys & _TILE_MASK] = values
+
+    def add(self, x, y, delta):
+        """Add `delta` to one cell."""
+        slot = self._index.item(x >> TILE_SHIFT, y >> TILE_SHIFT)
+        if slot == 0:
+            slot = self._allocate(x >> TILE_SHIFT, y >> TILE_SHIFT)
+        self._blocks[slot, x & _TILE_MASK, y & _TILE_MASK] += delta
+
+    def add_at(self, xs, ys, delta):
+        """np.add.at for cells: repeated positions accumulate."""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        tx, ty = xs >> TILE_SHIFT, ys >> TILE_SHIFT
+        unallocated = self._index[tx, ty] == 0
+        if unallocated.any():
+            for key in set(zip(tx[unallocated].tolist(), ty[unallocated].tolist())):
+                self._allocate(*key)
+        np.add.at(self._blocks, (self._index[tx, ty], xs & _TILE_MASK, ys & _TILE_MASK), delta)
+
+    def take(self, xs, ys, outside):
+        """Like self[xs, ys], with `outside` for positions off the array."""
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        off = (xs < 0) | (xs >= self.width) | (ys < 0) | (ys >= self.height)
+        if not off.any():
+            return self[xs, ys]
+        values = self[np.where(off, 0, xs), np.where(off, 0, ys)]
+        values[off] = outside
+        return values
+
+    def _parts(self, x0, x1, y0, y1):
+        # (tile, slice in the tile's block, slice in the window) for each tile the window covers
+        for tx in range(x0 >> TILE_SHIFT, ((x1 - 1) >> TILE_SHIFT) + 1):
+            bx = tx << TILE_SHIFT
+            lx0, lx1 = max(x0 - bx, 0), min(x1 - bx, TILE)
+            for ty in range(y0 >> TILE_SHIFT, ((y1 - 1) >> TILE_SHIFT) + 1):
+                by = ty << TILE_SHIFT
+                ly0, ly1 = max(y0 - by, 0), min(y1 - by, TILE)
+                yield (tx, ty, (slice(lx0, lx1), slice(ly0, ly1)),
+                       (slice(bx + lx0 - x0, bx + lx1 - x0), slice(by + ly0 - y0, by + ly1 - y0)))
+
+    def window(self, x0, x1, y0, y1):
+        """Copy of the block [x0, x1) x [y0, y1), which must lie on the array."""
+        out = np.full((x1 - x0, y1 - y0), self.fill, dtype=self.dtype)
+        for tx, ty, local, part in self._parts(x0, x1, y0, y1):
+            slot = self._index.item(tx, ty)
+            if slot:
+                out[part] = self._blocks[slot][local]
+        return out
+
+    def set_window(self, x0, x1, y0, y1, values):
+        for tx, ty, local, part in self._parts(x0, x1, y0, y1):
+            slot = self._index.item(tx, ty)
+            if slot == 0:
+                if (values[part] == self.fill).all():
+                    continue
+                slot = self._allocate(tx, ty)
+            self._blocks[slot][local] = values[part]
+
+    def scale(self, factor):
+        """Multiply every stored cell by `factor` (fill must be 0)."""
+        self._blocks[1:self._n] *= factor
+
+    def argmax(self):
+        """(x, y) of the largest value, the first one in x-major order on ties."""
+        best, best_flat = None, None
+        for tx, ty, block in self._clipped():
+            bx, by = np.unravel_index(int(np.argmax(block)), block.shape)
+            value = block.item(bx, by)
+            flat = ((tx << TILE_SHIFT) + bx) * self.height + (ty << TILE_SHIFT) + by
+            if best is None or value > best or (value == best and flat < best_flat):
+                best, best_flat = value, flat
+        # Cells of tiles never written hold fill; the first of them is a tile corner
+        tx, ty = np.nonzero(self._index == 0)
+        if tx.size and (best is None or self.fill >= best):
+            flat = int(((tx << TILE_SHIFT) * self.height + (ty << TILE_SHIFT)).min())
+            if best is None or self.fill > best or flat < best_flat:
+                best_flat = flat
+        return divmod(best_flat, self.height)
+
+    def _clipped(self):
+        # Allocated blocks cut down to the cells on the array
+        for tx, ty, block in self.allocated():
+            x0, y0 = tx << TILE_SHIFT, ty << TILE_SHIFT
+            yield tx, ty, block[:min(TILE, self.width - x0), :min(TILE, self.height - y0)]
+
+    def to_dense(self, out=None):
+        """The whole array as a dense (width, height) NumPy array."""
+        if out is None:
+            out = np.empty((self.width, self.height), dtype=self.dtype)
+        out.fill(self.fill)
+        for tx, ty, block in self._clipped():
+            x0, y0 = tx << TILE_SHIFT, ty << TILE_SHIFT
+            out[x0:x0 + block.shape[0], y0:y0 + block.shape[1]] = block
+        return out
@@ -0,0 +1,298 @@
+# core/population.py
+
+import numpy as np
+
+ADULT_AGE = 2
+MAX_AGE = 10
+MUTANT_MAX_AGE = 50
+
+SEXES = ("M", "F")
+SEX_CODES = {s: i for i, s in enumerate(SEXES)}
+
+# Role codes used by every vectorized pass over the population
+ROLE_JUVENILE = 0
+ROLE_MALE = 1
+ROLE_FEMALE = 2
+ROLE_VAMPIRE = 3
+ROLES = ("juvenile", "male", "female", "vampire")
+
+# FSM state names are stored as small integer codes; unknown names are registered on first use
+STATES = ["IDLE"]
+STATE_CODES = {"IDLE": 0}
+
+
+def state_code(name):
+    code = STATE_CODES.get(name)
+    if code is None:
+        code = STATE_CODES[name] = len(STATES)
+        STATES.append(name)
+    return code
+
+
+class Population:
+    """Columnar (struct-of-arrays) store for every live bunny.
+
+    Each bunny placed on a grid gets an integer id indexing the NumPy columns
+    below; `Bunny` objects are thin views onto their row. Ids of dead bunnies
+    are recycled, so `alive` marks which rows below `size` are in use.
+    """
+
+    COLUMNS = (
+        ("x", np.int32),
+        ("y", np.int32),
+        ("age", np.int32),
+        ("sex", np.int8),
+        ("mutant", np.bool_),
+        ("state", np.int8),
+        ("has_baby", np.bool_),
+        ("alive", np.bool_),
+        ("controlled", np.bool_),  # moved from outside (e.g. BunnyEnv); dispatchers skip it
+    )
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.views = [None] * capacity
+        self.size = 0      # high-water mark of allocated ids
+        self.count = 0     # live bunnies
+        self.adults = 0    # live bunnies aged ADULT_AGE or more, vampires included
+        self._free = []
+        # Called as on_role_change(bunny, old_role, new_role) whenever an infection
+        # or a birthday changes a live bunny's role; the owning Grid hooks this.
+        self.on_role_change = None
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(new_capacity, dtype=dtype)
+            column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self.views.extend([None] * (new_capacity - self.capacity))
+        self.capacity = new_capacity
+
+    def add(self, bunny):
+        """Give `bunny` a row and turn it into a view onto that row. Returns its id."""
+        if self._free:
+            idx = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            idx = self.size
+            self.size += 1
+
+        self.x[idx] = bunny._x
+        self.y[idx] = bunny._y
+        self.age[idx] = bunny._age
+        self.sex[idx] = SEX_CODES[bunny._sex]
+        self.mutant[idx] = bunny._is_mutant
+        self.state[idx] = state_code(bunny._state)
+        self.has_baby[idx] = bunny._has_baby
+        self.controlled[idx] = bunny._controlled
+        self.alive[idx] = True
+        self.views[idx] = bunny
+        self.count += 1
+        if bunny._age >= ADULT_AGE:
+            self.adults += 1
+
+        bunny._pop = self
+        bunny.id = idx
+        return idx
+
+    def release(self, bunny):
+        """Free the bunny's row. The Bunny keeps a detached copy of its last values."""
+        idx = bunny.id
+        if bunny._pop is not self or not self.alive[idx]:
+            return
+        bunny._x = self.x.item(idx)
+        bunny._y = self.y.item(idx)
+        bunny._age = self.age.item(idx)
+        bunny._sex = SEXES[self.sex.item(idx)]
+        bunny._is_mutant = self.mutant.item(idx)
+        bunny._state = STATES[self.state.item(idx)]
+        bunny._has_baby = self.has_baby.item(idx)
+        bunny._controlled = self.controlled.item(idx)
+        bunny._pop = None
+        bunny.id = None
+
+        self.alive[idx] = False
+        self.views[idx] = None
+        self.count -= 1
+        if bunny._age >= ADULT_AGE:
+            self.adults -= 1
+        self._free.append(idx)
+
+    def role_of(self, idx):
+        if self.mutant[idx]:
+            return ROLE_VAMPIRE
+        if self.age[idx] < ADULT_AGE:
+            return ROLE_JUVENILE
+        return ROLE_FEMALE if self.sex[idx] == SEX_CODES["F"] else ROLE_MALE
+
+    def _set_with_role_check(self, column, idx, value):
+        old_role = self.role_of(idx)
+        column[idx] = value
+        if self.on_role_change is not None:
+            new_role = self.role_of(idx)
+            if new_role != old_role:
+                self.on_role_change(self.views[idx], old_role, new_role)
+
+    def set_mutant(self, idx, value):
+        self._set_with_role_check(self.mutant, idx, bool(value))
+
+    def set_age(self, idx, value):
+        self.adults += int(value >= ADULT_AGE) - int(self.age.item(idx) >= ADULT_AGE)
+        self._set_with_role_check(self.age, idx, value)
+
+    # --- Whole-population operations ---
+
+    def alive_ids(self):
+        return np.flatnonzero(self.alive[:self.size])
+
+    def max_ages(self, ids):
+        return np.where(self.mutant[ids], MUTANT_MAX_AGE, MAX_AGE)
+
+    def advance_age(self):
+        """Age every live bunny by one turn and clear last turn's births.
+
+        Returns the Bunny views that are now past their max age; removing
+        them from the grid is left to the caller.
+        """
+        ids = self.alive_ids()
+        self.has_baby[ids] = False
+        self.age[ids] += 1
+        self.adults += int(np.count_nonzero(self.age[ids] == ADULT_AGE))
+
+        if self.on_role_change is not None:
+            grown = ids[(self.age[ids] == ADULT_AGE) & ~self.mutant[ids]]
+            for i in grown.tolist():
+                new_role = ROLE_FEMALE if self.sex[i] == SEX_CODES["F"] else ROLE_MALE
+                self.on_role_change(self.views[i], ROLE_JUVENILE, new_role)
+
+        expired = ids[self.age[ids] > self.max_ages(ids)]
+        return [self.views[i] for i in expired.tolist()]
+
+    def roles(self, ids=None):
+        """Role code (ROLE_*) for each id in `ids` (default: every live bunny)."""
+        if ids is None:
+            ids = self.alive_ids()
+        sex = self.sex[ids]
+        role = np.where(sex == SEX_CODES["F"], ROLE_FEMALE, ROLE_MALE)
+        role[self.age[ids] < ADULT_AGE] = ROLE_JUVENILE
+        role[self.mutant[ids]] = ROLE_VAMPIRE
+        return role
+
+    def role_counts(self):
+        """Counts per role name plus 'adults' (age-based, vampires included)."""
+        ids = self.alive_ids()
+        counts = np.bincount(self.roles(ids), minlength=len(ROLES))
+        stats = {name: int(counts[code]) for code, name in enumerate(ROLES)}
+        stats["adults"] = int(np.count_nonzero(self.age[ids] >= ADULT_AGE))
+        return stats
+
+    def adult_female_positions(self):
+        """(xs, ys) of every live, non-mutant adult female."""
+        ids = self.alive_ids()
+        ids = ids[self.roles(ids) == ROLE_FEMALE]
+        return self.x[ids], self.y[ids]
+
+
+class _FrozenBunnies:
+    """The first `n` entries of a frozen BunnyList: every bunny present at freeze time."""
+
+    __slots__ = ("items", "n")
+
+    def __init__(self, items, n):
+        self.items = items
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.items[:self.n][i] if isinstance(i, slice) else self.items[range(self.n)[i]]
+
+    def __iter__(self):
+        items = self.items
+        for i in range(self.n):
+            yield items[i]
+
+
+class BunnyList:
+    """Indexed container for the bunnies on a grid.
+
+    Append and remove are O(1): a position index keyed by population id lets
+    remove() swap the last bunny into the hole. While frozen (see freeze())
+    removals only mark the slot dead and compaction waits until the turn is
+    over, so the turn's bunnies can be walked without copying the list.
+    """
+
+    def __init__(self):
+        self._items = []
+        self._alive = bytearray()
+        self._pos = {}       # population id -> index in _items
+        self._frozen = 0
+        self._holes = []     # positions removed while frozen
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __bool__(self):
+        return bool(self._pos)
+
+    def __contains__(self, bunny):
+        pos = self._pos.get(bunny.id)
+        return pos is not None and self._items[pos] is bunny
+
+    def __iter__(self):
+        items, alive = self._items, self._alive
+        for i in range(len(items)):
+            if alive[i]:
+                yield items[i]
+
+    def append(self, bunny):
+        self._pos[bunny.id] = len(self._items)
+        self._items.append(bunny)
+        self._alive.append(1)
+
+    def remove(self, bunny):
+        """Remove a bunny that is still attached to its population (its id is the key)."""
+        pos = self._pos.pop(bunny.id)
+        if self._frozen:
+            self._alive[pos] = 0
+            self._holes.append(pos)
+            return
+        last = self._items.pop()
+        self._alive.pop()
+        if pos < len(self._items):
+            self._items[pos] = last
+            self._pos[last.id] = pos
+
+    def freeze(self):
+        """Return a view of the current bunnies that stays valid until thaw().
+
+        Bunnies removed meanwhile stay in the view; bunnies added meanwhile
+        are not in it.
+        """
+        self._frozen += 1
+        return _FrozenBunnies(self._items, len(self._items))
+
+    def thaw(self):
+        self._frozen -= 1
+        if self._frozen == 0 and self._holes:
+            self._compact()
+
+    def _compact(self):
+        # Fill holes from the tail, highest first, so the tail is always live
+        items, alive = self._items, self._alive
+        for pos in sorted(self._holes, reverse=True):
+            last = items.pop()
+            alive.pop()
+            if pos < len(items):
+                items[pos] = last
+                alive[pos] = 1
+                self._pos[last.id] = pos
+        self._holes = []
@@ -0,0 +1,173 @@
+# core/profiler.py
+#
+# Opt-in per-turn instrumentation: wall time per turn phase and per role,
+# plus call counts and time of the hot grid helpers, written out every N turns.
+
+import csv
+import json
+import os
+import threading
+from time import perf_counter_ns
+
+from core.population import ROLES
+
+PHASES = ("heatmap", "aging", "dispatch", "stats", "observers", "snapshot", "render")
+
+# (attribute path on the grid, name in the report)
+HOT_HELPERS = (
+    ("nearest_vampire_distance", "nearest_vampire_distance"),
+    ("get_adjacent_bunnies", "get_adjacent_bunnies"),
+    ("get_adjacent_empty_tiles", "get_adjacent_empty_tiles"),
+    ("is_empty", "is_empty"),
+    ("density_around", "density_around"),
+    ("female_heatmap.best_tile", "best_tile"),
+    ("female_heatmap.value", "heatmap_value"),
+)
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, perf_counter_ns() - self.start)
+        return False
+
+
+class TurnProfiler:
+    """Collects timings while attached to a Simulation (Simulation(profiler=...)).
+
+    Every `every` turns the window is summarised into one row: mean ms per
+    turn for each phase, ms and calls per turn for each role's dispatch and
+    each hot helper. Rows are kept in `rows` and, with `path`, appended to a
+    CSV file or (any other extension) a JSON Lines file. helpers=False skips
+    the helper wrappers for callers that only want phase and role times.
+    """
+
+    def __init__(self, path=None, every=100, helpers=True):
+        self.path = path
+        self.every = every
+        self.helpers = helpers
+        self.rows = []
+        self._lock = threading.Lock()  # render times come from the UI thread
+        self._file = None
+        self._writer = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "w", newline="")
+            if path.endswith(".csv"):
+                self._writer = csv.DictWriter(self._file, fieldnames=self.columns())
+                self._writer.writeheader()
+        self._reset(0)
+
+    @staticmethod
+    def columns():
+        cols = ["turn_start", "turn_end", "turns", "population"]
+        cols += [f"phase_{p}_ms" for p in PHASES]
+        for role in ROLES:
+            cols += [f"role_{role}_ms", f"role_{role}_calls"]
+        for _, name in HOT_HELPERS:
+            cols += [f"helper_{name}_ms", f"helper_{name}_calls"]
+        return cols
+
+    def _reset(self, turn):
+        self._start_turn = turn + 1
+        self._turns = 0
+        self._population = 0
+        self._phases = dict.fromkeys(PHASES, 0)
+        self._roles = {role: [0, 0] for role in ROLES}
+        self._helpers = {name: [0, 0] for _, name in HOT_HELPERS}
+
+    # --- recording ---
+
+    def phase(self, name):
+        """Context manager timing one phase: `with profiler.phase("heatmap"): ...`"""
+        return _Phase(self, name)
+
+    def add(self, name, ns):
+        with self._lock:
+            self._phases[name] = self._phases.get(name, 0) + ns
+
+    def add_role(self, role, ns, calls=1):
+        entry = self._roles.get(role)
+        if entry is not None:
+            entry[0] += ns
+            entry[1] += calls
+
+    def instrument(self, grid):
+        """Wrap the HOT_HELPERS of `grid` (and its heatmap) in counting timers.
+
+        The wrappers are instance attributes, so grids that are not profiled
+        keep calling the plain methods.
+        """
+        if not self.helpers:
+            return
+        for path, name in HOT_HELPERS:
+            *owners, attr = path.split(".")
+            owner = grid
+            for part in owners:
+                owner = getattr(owner, part, None)
+            if owner is None:
+                continue  # e.g. a grid without a female heatmap
+            setattr(owner, attr, self._timed(getattr(owner, attr), self._helpers[name]))
+
+    @staticmethod
+    def _timed(func, entry):
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry[0] += perf_counter_ns() - start
+                entry[1] += 1
+        timed.__wrapped__ = func
+        return timed
+
+    def end_turn(self, sim):
+        self._turns += 1
+        self._population += len(sim.grid.bunnies)
+        if self._turns >= self.every:
+            self.emit(sim.turn)
+
+    # --- reporting ---
+
+    def emit(self, turn):
+        """Close the current window (if it has any turns) and write its row."""
+        n = self._turns
+        if n == 0:
+            return None
+        with self._lock:
+            row = {"turn_start": self._start_turn, "turn_end": turn, "turns": n,
+                   "population": round(self._population / n, 1)}
+            for name in PHASES:
+                row[f"phase_{name}_ms"] = round(self._phases[name] / n / 1e6, 4)
+            for role, (ns, calls) in self._roles.items():
+                row[f"role_{role}_ms"] = round(ns / n / 1e6, 4)
+                row[f"role_{role}_calls"] = round(calls / n, 2)
+            for name, (ns, calls) in self._helpers.items():
+                row[f"helper_{name}_ms"] = round(ns / n / 1e6, 4)
+                row[f"helper_{name}_calls"] = round(calls / n, 2)
+            self._reset(turn)
+
+        self.rows.append(row)
+        if self._writer is not None:
+            self._writer.writerow(row)
+            self._file.flush()
+        elif self._file is not None:
+            self._file.write(json.dumps(row) + "\n")
+            self._file.flush()
+        return row
+
+    def close(self, turn=None):
+        if turn is not None:
+            self.emit(turn)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
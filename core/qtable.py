@@ -0,0 +1,321 @@
+# core/qtable.py
+
+import os
+import secrets
+import stat
+import numpy as np
+
+N_ACTIONS = 6  # 0–4: directions, 5: role action
+
+# Layout of the state tuples returned by BunnyRLAgent.get_state, per role:
+# (field type, number of values) for every field after the role name.
+STATE_FIELDS = {
+    "juvenile": ((int, 5), (bool, 2), (bool, 2)),                        # age_bin, vampire_near, empty
+    "male": ((int, 5), (bool, 2), (bool, 2), (int, 2), (bool, 2)),       # age_bin, female_adj, vampire_near, heat, empty
+    "female": ((int, 5), (int, 2), (bool, 2), (bool, 2), (bool, 2)),     # age_bin, has_baby, vampire_near, male_adj, empty
+    "vampire": ((int, 5), (bool, 2), (bool, 2)),                         # age_bin, empty, vampire_near
+}
+
+# Every role's states get a contiguous block of indices
+STATE_OFFSETS = {}
+_ROLE_BLOCKS = []
+N_STATES = 0
+for _role, _fields in STATE_FIELDS.items():
+    _size = int(np.prod([n for _, n in _fields]))
+    STATE_OFFSETS[_role] = N_STATES
+    _ROLE_BLOCKS.append((N_STATES, N_STATES + _size, _role))
+    N_STATES += _size
+
+
+def encode_state(state):
+    """Map a get_state() tuple to its dense integer index."""
+    fields = STATE_FIELDS[state[0]]
+    if len(state) != len(fields) + 1:
+        raise ValueError(f"Unexpected state shape: {state!r}")
+    idx = 0
+    for value, (_, size) in zip(state[1:], fields):
+        value = int(value)
+        if not 0 <= value < size:
+            raise ValueError(f"State field out of range: {state!r}")
+        idx = idx * size + value
+    return STATE_OFFSETS[state[0]] + idx
+
+
+def encode_states(role, columns):
+    """Vectorized encode_state for one role; `columns` has one array per state field."""
+    idx = np.zeros(len(columns[0]), dtype=np.intp)
+    for column, (_, size) in zip(columns, STATE_FIELDS[role]):
+        idx = idx * size + np.asarray(column, dtype=np.intp)
+    return idx + STATE_OFFSETS[role]
+
+
+def decode_state(idx):
+    """Inverse of encode_state."""
+    for start, end, role in _ROLE_BLOCKS:
+        if start <= idx < end:
+            break
+    else:
+        raise IndexError(idx)
+    local = idx - start
+    values = []
+    for kind, size in reversed(STATE_FIELDS[role]):
+        local, value = divmod(local, size)
+        values.append(kind(value))
+    return (role,) + tuple(reversed(values))
+
+
+class QTable:
+    """Dense Q-table over every encodable state.
+
+    `q` is a float32 array of shape (N_STATES, N_ACTIONS) and `visited` marks
+    the states that have been seen, which are the keys of the dict-compatible
+    view (`state in table`, `table[state]`, `items()`, `len(table)`).
+    """
+
+    def __init__(self, n_actions=N_ACTIONS):
+        self.q = np.zeros((N_STATES, n_actions), dtype=np.float32)
+        self.visited = np.zeros(N_STATES, dtype=bool)
+
+    @classmethod
+    def from_dict(cls, table):
+        """Build from a {state tuple: [values]} dict such as an old pickle."""
+        qt = cls()
+        skipped = 0
+        for state, values in table.items():
+            try:
+                qt[state] = values
+            except (KeyError, ValueError, TypeError, IndexError):
+                skipped += 1
+        if skipped:
+            print(f"[WARN] Skipped {skipped} states that do not fit the Q-table layout")
+        return qt
+
+    def to_dict(self):
+        return {decode_state(i): [float(v) for v in self.q[i]] for i in np.flatnonzero(self.visited)}
+
+    def copy(self):
+        qt = QTable.__new__(QTable)
+        qt.q = self.q.copy()
+        qt.visited = self.visited.copy()
+        return qt
+
+    # --- dict-compatible view ---
+
+    def __contains__(self, state):
+        try:
+            return bool(self.visited[encode_state(state)])
+        except (KeyError, ValueError, TypeError):
+            return False
+
+    def __getitem__(self, state):
+        idx = encode_state(state)
+        if not self.visited[idx]:
+            raise KeyError(state)
+        return self.q[idx]
+
+    def __setitem__(self, state, values):
+        idx = encode_state(state)
+        self.q[idx] = values
+        self.visited[idx] = True
+
+    def __len__(self):
+        return int(np.count_nonzero(self.visited))
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        return (decode_state(i) for i in np.flatnonzero(self.visited))
+
+    def items(self):
+        return ((decode_state(i), self.q[i]) for i in np.flatnonzero(self.visited))
+
+    def get(self, state, default=None):
+        return self[state] if state in self else default
+
+    # --- indexed fast paths ---
+
+    def greedy(self, idx):
+        """Best action for state index `idx` (first one on ties)."""
+        return int(self.q[idx].argmax())
+
+    def update(self, s, a, r, s_prime, alpha, gamma):
+        """One TD(0) update on state indices."""
+        self.visited[s] = True
+        self.visited[s_prime] = True
+        row = self.q[s]
+        row[a] += alpha * (r + gamma * self.q[s_prime].max() - row[a])
+
+    def update_terminal(self, s, a, r, alpha):
+        """TD update for a final transition: there is no next state to bootstrap from."""
+        self.visited[s] = True
+        row = self.q[s]
+        row[a] += alpha * (r - row[a])
+
+    def update_batch(self, s, a, r, s_prime, alpha, gamma):
+        """TD(0) updates for arrays of transitions, vectorized.
+
+        Targets are computed from the table as it was before the batch.
+        Transitions that hit the same (state, action) pair are applied as if
+        one after another, in batch order: after k of them the value is
+        (1-alpha)^k * Q + sum_j alpha * (1-alpha)^(k-1-j) * target_j, so the
+        result matches the scalar update() loop whenever no transition
+        bootstraps from a pair the batch also writes.
+        """
+        s = np.asarray(s, dtype=np.intp)
+        a = np.asarray(a, dtype=np.intp)
+        s_prime = np.asarray(s_prime, dtype=np.intp)
+        if s.size == 0:
+            return
+        self.visited[s] = True
+        self.visited[s_prime] = True
+        target = np.asarray(r, dtype=np.float64) + gamma * self.q[s_prime].max(axis=1)
+
+        keys = s * self.q.shape[1] + a
+        order = np.argsort(keys, kind="stable")
+        unique, first, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        group = np.repeat(np.arange(unique.size), counts)
+        rank = np.arange(order.size) - first[group]   # position within its pair, in batch order
+        weights = alpha * (1 - alpha) ** (counts[group] - 1 - rank)
+        blended = np.bincount(group, weights=weights * target[order], minlength=unique.size)
+
+        us, ua = np.divmod(unique, self.q.shape[1])
+        self.q[us, ua] = (1 - alpha) ** counts * self.q[us, ua] + blended
+
+
+def merge_qtables(old_q, new_q, alpha=0.5):
+    """Blend new_q into old_q: (1-alpha)*old + alpha*new where both saw a state,
+    new values where only new_q did. Returns a new QTable."""
+    merged = old_q.copy()
+    both = old_q.visited & new_q.visited
+    merged.q[both] = (1 - alpha) * old_q.q[both] + alpha * new_q.q[both]
+    only_new = new_q.visited & ~old_q.visited
+    merged.q[only_new] = new_q.q[only_new]
+    merged.visited |= new_q.visited
+    return merged
+
+
+def as_qtable(table):
+    """Return `table` as a QTable, converting a legacy dict if needed."""
+    if isinstance(table, QTable):
+        return table
+    return QTable.from_dict(table or {})
+
+
+def as_dict(table):
+    """Return `table` as a plain {state: [values]} dict."""
+    if isinstance(table, QTable):
+        return table.to_dict()
+    return table
+
+
+# --- On-disk format ---
+#
+# A .qtab file is a 16-byte header (magic, version, n_states, n_actions)
+# followed by the float32 values in row-major order and one visited byte per
+# state. The fixed layout lets load_qtable map the file without copying it.
+
+QTABLE_EXT = ".qtab"
+QTABLE_MAGIC = b"BQTB"
+QTABLE_VERSION = 1
+_HEADER = np.dtype([("magic", "S4"), ("version", "<u4"), ("n_states", "<u4"), ("n_actions", "<u4")])
+
+# Windows cannot replace a file that is still mapped, so copy on load there
+MMAP_DEFAULT = os.name != "nt"
+
+
+def _create_temp(directory, name):
+    """Open a new, exclusive temp file next to `name`.
+
+    Like open() it is created with mode 0o666 less the umask, applied by the
+    kernel (mkstemp would give 0600, and reading the umask means changing it
+    for every thread).
+    """
+    while True:
+        tmp_path = os.path.join(directory, f".tmp-{name}-{secrets.token_hex(4)}")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def atomic_write(file_path, write):
+    """Call write(f) on a temp file next to file_path, then rename it into place.
+
+    A run killed mid-save leaves the previous file untouched. The file keeps
+    the mode of the one it replaces, or gets the umask default like open().
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = _create_temp(directory, os.path.basename(file_path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(file_path).st_mode))  # keep the old file's mode
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_qtable(table, file_path):
+    table = as_qtable(table)
+    n_states, n_actions = table.q.shape
+    header = np.array([(QTABLE_MAGIC, QTABLE_VERSION, n_states, n_actions)], dtype=_HEADER)
+
+    def write(f):
+        f.write(header.tobytes())
+        f.write(np.ascontiguousarray(table.q, dtype="<f4").tobytes())
+        f.write(table.visited.astype(np.uint8).tobytes())
+
+    atomic_write(file_path, write)
+
+
+def load_qtable(file_path, mmap=MMAP_DEFAULT):
+    """Load a .qtab file, or return None if it is missing or does not match the layout.
+
+    With mmap=True the arrays are copy-on-write maps of the file: nothing is
+    read until it is touched, and writes never reach the file.
+    """
+    if not os.path.exists(file_path):
+        return None
+    header = np.fromfile(file_path, dtype=_HEADER, count=1)
+    if header.size == 0 or header["magic"][0] != QTABLE_MAGIC or header["version"][0] != QTABLE_VERSION:
+        print(f"[WARN] {file_path} is not a Q-table file.")
+        return None
+    n_states, n_actions = int(header["n_states"][0]), int(header["n_actions"][0])
+    if n_states != N_STATES:
+        print(f"[WARN] {file_path} has {n_states} states, expected {N_STATES}; ignoring it.")
+        return None
+    values_offset = _HEADER.itemsize
+    visited_offset = values_offset + n_states * n_actions * 4
+    if os.path.getsize(file_path) != visited_offset + n_states:
+        print(f"[WARN] {file_path} is truncated or corrupted.")
+        return None
+
+    table = QTable.__new__(QTable)
+    if mmap:
+        table.q = np.memmap(file_path, dtype="<f4", mode="c", offset=values_offset, shape=(n_states, n_actions))
+        table.visited = np.memmap(file_path, dtype=np.bool_, mode="c", offset=visited_offset, shape=(n_states,))
+    else:
+        with open(file_path, "rb") as f:
+            f.seek(values_offset)
+            table.q = np.fromfile(f, dtype="<f4", count=n_states * n_actions).reshape(n_states, n_actions)
+            table.visited = np.fromfile(f, dtype=np.uint8, count=n_states).astype(bool)
+    return table
+
+
+def merge_into_file(table, file_path, alpha=0.5):
+    """Merge `table` into the .qtab at file_path (created if missing) and save atomically."""
+    table = as_qtable(table)
+    existing = load_qtable(file_path)
+    merged = merge_qtables(existing, table, alpha) if existing is not None else table
+    del existing  # drop the mapping before the file is replaced
+    save_qtable(merged, file_path)
+    return merged
@@ -0,0 +1,151 @@
+# core/renderer.py
+
+import numpy as np
+import pygame
+
+from core.bunny import draw_bunny_shape
+from core.grid import TILE_SIZE, BG_COLOR, GRID_COLOR
+
+
+def default_hud(snapshot, fps):
+    counts = snapshot.counts
+    adults, mutants = counts["adults"], counts["vampire"]
+    fps_display = f"{fps:.1f}" if fps > 1.0 else "--"
+    return [
+        f"Turn: {snapshot.turn}",
+        f"FPS: {fps_display}",
+        f"Bunnies: {snapshot.population} (Adults: {adults}, Mutants: {mutants})",
+        f"Max Population: {snapshot.max_population}",
+        f"Avg Reward: {snapshot.avg_reward:.2f}",
+    ]
+
+
+# Sprite keys (OccupancyRaster.tile_keys): observation code * 2, plus the sex
+# bit for juveniles (whose look depends on it). 0 is an empty tile.
+SPRITE_KINDS = {
+    2: (False, 'M', False),   # juvenile male
+    3: (False, 'F', False),   # juvenile female
+    4: (False, 'M', True),    # adult male
+    6: (False, 'F', True),    # adult female
+    8: (True, 'M', True),     # vampire
+}
+
+
+class PygameRenderer:
+    """Draws Simulation snapshots and a HUD with pygame.
+
+    Use it as a Simulation observer, or call draw() with snapshots from a
+    core.scheduler.Scheduler. The background (grid lines included) and one
+    tile per bunny kind are rendered once. Each frame compares every cell's
+    sprite key with the last frame, blits only the tiles that changed, and
+    hands just those rects (plus the HUD) to pygame.display.update.
+    """
+
+    def __init__(self, grid, caption="Bunny Simulator", hud=default_hud):
+        pygame.init()
+        self.screen = pygame.display.set_mode(grid.screen_size)
+        pygame.display.set_caption(caption)
+        grid.screen = self.screen
+
+        self.font = pygame.font.SysFont(None, 24)
+        self.clock = pygame.time.Clock()
+        self.hud = hud
+        self.running = True
+
+        self.sprites = self._render_sprites()
+        self.background = self._render_background(grid.screen_size)
+        self._world = None
+        self._keys = None
+        self._hud_rect = None
+
+    def _render_sprites(self):
+        empty = pygame.Surface((TILE_SIZE, TILE_SIZE))
+        empty.fill(BG_COLOR)
+        # Tiles are drawn with their top and left grid lines, so tiling them
+        # reproduces Grid.draw_grid
+        pygame.draw.line(empty, GRID_COLOR, (0, 0), (0, TILE_SIZE))
+        pygame.draw.line(empty, GRID_COLOR, (0, 0), (TILE_SIZE, 0))
+        sprites = [None] * (max(SPRITE_KINDS) + 1)
+        sprites[0] = empty
+        for key, (is_mutant, sex, adult) in SPRITE_KINDS.items():
+            tile = empty.copy()
+            draw_bunny_shape(tile, 0, 0, is_mutant, sex, adult)
+            sprites[key] = tile
+        return sprites
+
+    def _render_background(self, size):
+        background = pygame.Surface(size)
+        tile = self.sprites[0]
+        for px in range(0, size[0], TILE_SIZE):
+            for py in range(0, size[1], TILE_SIZE):
+                background.blit(tile, (px, py))
+        return background
+
+    def poll_events(self):
+        """Pump the pygame event queue. Returns False once the window is closed."""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+        return self.running
+
+    def tick(self, fps=60):
+        self.clock.tick(fps)
+
+    def _blit_tiles(self, keys, xs, ys):
+        blit, sprites = self.screen.blit, self.sprites
+        rects = []
+        for x, y, key in zip(xs.tolist(), ys.tolist(), keys[xs, ys].tolist()):
+            rects.append(blit(sprites[key], (x * TILE_SIZE, y * TILE_SIZE)))
+        return rects
+
+    def _tiles_under(self, rect):
+        x0, y0 = rect.left // TILE_SIZE, rect.top // TILE_SIZE
+        x1 = min(self._keys.shape[0], (rect.right - 1) // TILE_SIZE + 1)
+        y1 = min(self._keys.shape[1], (rect.bottom - 1) // TILE_SIZE + 1)
+        xs, ys = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing="ij")
+        return xs.ravel(), ys.ravel()
+
+    def __call__(self, sim):
+        self.draw(sim.snapshot())
+
+    def draw(self, snapshot):
+        keys = snapshot.tiles
+
+        if snapshot.world != self._world or self._keys is None or self._keys.shape != keys.shape:
+            # First frame (or a new world): draw everything once
+            self._world = snapshot.world
+            self._keys = keys
+            self.screen.blit(self.background, (0, 0))
+            xs, ys = np.nonzero(keys)
+            self._blit_tiles(keys, xs, ys)
+            self._hud_rect = None
+            self._draw_hud(snapshot)
+            pygame.display.flip()
+            return
+
+        xs, ys = np.nonzero(keys != self._keys)
+        self._keys = keys
+        rects = self._blit_tiles(keys, xs, ys)
+        rects.extend(self._draw_hud(snapshot))
+        if rects:
+            pygame.display.update(rects)
+
+    def _draw_hud(self, snapshot):
+        """Redraw the HUD over fresh tiles. Returns the rects it touched."""
+        if not self.hud:
+            return []
+        rects = []
+        if self._hud_rect is not None:
+            # Restore the tiles under last frame's text
+            rects.extend(self._blit_tiles(self._keys, *self._tiles_under(self._hud_rect)))
+        text_rects = []
+        for i, line in enumerate(self.hud(snapshot, self.clock.get_fps())):
+            text = self.font.render(line, True, (255, 255, 255))
+            text_rects.append(self.screen.blit(text, (10, 10 + i * 20)))
+        if text_rects:
+            self._hud_rect = text_rects[0].unionall(text_rects[1:])
+            rects.append(self._hud_rect)
+        return rects
+
+    def close(self):
+        pygame.quit()
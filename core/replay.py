@@ -0,0 +1,176 @@
+# core/replay.py
+#
+# Record a run as its seed plus a compact per-turn delta of the world, and
+# rebuild the world at any turn without the dispatcher or any Q-tables.
+
+import numpy as np
+from core.layers import GridLayer
+from core.population import ADULT_AGE, ROLE_VAMPIRE, SEX_CODES
+
+# Event opcodes; every event is an int32 row (op, id, x, y, arg)
+PLACE = 0    # arg packs age * 4 + sex * 2 + mutant
+MOVE = 1
+REMOVE = 2
+INFECT = 3   # arg is the new mutant flag
+
+
+class WorldState:
+    """The world at one turn, as parallel arrays ordered by bunny id."""
+
+    def __init__(self, turn, width, height, ids, x, y, sex, mutant, age):
+        self.turn = turn
+        self.width = width
+        self.height = height
+        self.ids = ids
+        self.x = x
+        self.y = y
+        self.sex = sex          # 0 = 'M', 1 = 'F'
+        self.mutant = mutant
+        self.age = age
+
+    def __len__(self):
+        return len(self.ids)
+
+    def counts(self):
+        juvenile = ~self.mutant & (self.age < ADULT_AGE)
+        adult = ~self.mutant & ~juvenile
+        return {
+            "juvenile": int(juvenile.sum()),
+            "male": int((adult & (self.sex == SEX_CODES["M"])).sum()),
+            "female": int((adult & (self.sex == SEX_CODES["F"])).sum()),
+            "vampire": int(self.mutant.sum()),
+        }
+
+
+class Recorder(GridLayer):
+    """Records a Simulation: a grid layer for the deltas, an observer for turn ends.
+
+    A full keyframe of the population is stored every `keyframe_every` turns
+    so a replay never has to apply more than that many turns of deltas.
+    """
+
+    def __init__(self, sim, keyframe_every=100):
+        self.sim = sim
+        self.keyframe_every = keyframe_every
+        self.width = sim.grid.GRID_WIDTH
+        self.height = sim.grid.GRID_HEIGHT
+
+        self._turn_events = []
+        self._chunks = []                 # one int32 (n, 5) array per turn
+        self.turn_offsets = [0]           # events of turn t: [offsets[t - t0], offsets[t - t0 + 1])
+        self.start_turn = sim.turn
+        self.keyframes = {}
+
+        sim.grid.add_layer(self)
+        self._turn_events = []            # add_layer replayed the population; the keyframe covers it
+        self._keyframe()
+        sim.add_observer(self.end_turn)
+
+    # --- GridLayer hooks ---
+
+    def on_place(self, bunny):
+        arg = bunny.age * 4 + SEX_CODES[bunny.sex] * 2 + int(bunny.is_mutant)
+        self._turn_events.append((PLACE, bunny.id, bunny.x, bunny.y, arg))
+
+    def on_move(self, bunny, old_x, old_y):
+        self._turn_events.append((MOVE, bunny.id, bunny.x, bunny.y, 0))
+
+    def on_remove(self, bunny):
+        self._turn_events.append((REMOVE, bunny.id, 0, 0, 0))
+
+    def on_role_change(self, bunny, old_role, new_role):
+        if (old_role == ROLE_VAMPIRE) != (new_role == ROLE_VAMPIRE):
+            self._turn_events.append((INFECT, bunny.id, bunny.x, bunny.y, int(new_role == ROLE_VAMPIRE)))
+
+    # --- observer ---
+
+    def end_turn(self, sim):
+        events = np.array(self._turn_events, dtype=np.int32).reshape(-1, 5)
+        self._turn_events = []
+        self._chunks.append(events)
+        self.turn_offsets.append(self.turn_offsets[-1] + len(events))
+        if sim.turn % self.keyframe_every == 0:
+            self._keyframe()
+
+    def _keyframe(self):
+        pop = self.sim.grid.population
+        ids = pop.alive_ids()
+        self.keyframes[self.sim.turn] = np.stack([
+            ids, pop.x[ids], pop.y[ids], pop.sex[ids], pop.mutant[ids], pop.age[ids],
+        ]).astype(np.int32)
+
+    def detach(self):
+        self.sim.grid.remove_layer(self)
+        self.sim.remove_observer(self.end_turn)
+
+    def save(self, path):
+        events = np.concatenate(self._chunks) if self._chunks else np.zeros((0, 5), dtype=np.int32)
+        turns = sorted(self.keyframes)
+        frames = [self.keyframes[t] for t in turns]
+        np.savez_compressed(
+            path,
+            meta=np.array([self.start_turn, self.width, self.height,
+                           -1 if self.sim.seed is None else self.sim.seed], dtype=np.int64),
+            events=events,
+            turn_offsets=np.array(self.turn_offsets, dtype=np.int64),
+            keyframe_turns=np.array(turns, dtype=np.int64),
+            keyframe_sizes=np.array([f.shape[1] for f in frames], dtype=np.int64),
+            keyframes=np.concatenate(frames, axis=1) if frames else np.zeros((6, 0), dtype=np.int32),
+        )
+
+
+class Replay:
+    """Rebuilds the world of a recorded run at any turn."""
+
+    def __init__(self, meta, events, turn_offsets, keyframe_turns, keyframe_sizes, keyframes):
+        self.start_turn, self.width, self.height, seed = (int(v) for v in meta)
+        self.seed = None if seed < 0 else seed
+        self.events = events
+        self.turn_offsets = turn_offsets
+        self.keyframe_turns = keyframe_turns
+        bounds = np.concatenate([[0], np.cumsum(keyframe_sizes)])
+        self._keyframes = [keyframes[:, bounds[i]:bounds[i + 1]] for i in range(len(keyframe_turns))]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{k: data[k] for k in data.files})
+
+    @property
+    def last_turn(self):
+        return self.start_turn + len(self.turn_offsets) - 1
+
+    def state_at(self, turn):
+        """The world as it was at the end of `turn`."""
+        if not self.start_turn <= turn <= self.last_turn:
+            raise ValueError(f"Turn {turn} is outside the recording "
+                             f"({self.start_turn}-{self.last_turn})")
+        k = int(np.searchsorted(self.keyframe_turns, turn, side="right")) - 1
+        base_turn = int(self.keyframe_turns[k])
+
+        # id -> [x, y, sex, mutant, age, turn the age was taken]
+        bunnies = {int(i): [int(x), int(y), int(s), int(m), int(a), base_turn]
+                   for i, x, y, s, m, a in self._keyframes[k].T}
+
+        first = base_turn + 1 - self.start_turn
+        last = turn - self.start_turn
+        for t in range(first, last + 1):
+            lo, hi = self.turn_offsets[t - 1], self.turn_offsets[t]
+            for op, idx, x, y, arg in self.events[lo:hi].tolist():
+                if op == MOVE:
+                    entry = bunnies[idx]
+                    entry[0], entry[1] = x, y
+                elif op == PLACE:
+                    bunnies[idx] = [x, y, (arg >> 1) & 1, arg & 1, arg >> 2, self.start_turn + t]
+                elif op == REMOVE:
+                    del bunnies[idx]
+                else:
+                    bunnies[idx][3] = arg
+
+        ids = np.array(sorted(bunnies), dtype=np.int32)
+        rows = np.array([bunnies[i] for i in ids.tolist()], dtype=np.int64).reshape(-1, 6)
+        # Everyone alive ages once per turn after the turn their age was taken
+        age = rows[:, 4] + (turn - rows[:, 5])
+        return WorldState(turn, self.width, self.height, ids,
+                          rows[:, 0].astype(np.int32), rows[:, 1].astype(np.int32),
+                          rows[:, 2].astype(np.int8), rows[:, 3].astype(bool), age.astype(np.int32))
@@ -3,9 +3,17 @@
 import os
 import pickle
 import random
+import numpy as np
+from core.qtable import (
+    QTABLE_EXT, QTable, as_dict, as_qtable, atomic_write, encode_state, encode_states,
+    load_qtable, merge_into_file, merge_qtables, save_qtable,
+)
 
 
 def merge_q_tables(old_q, new_q, alpha=0.5):
+    if isinstance(old_q, QTable) or isinstance(new_q, QTable):
+        return merge_qtables(as_qtable(old_q), as_qtable(new_q), alpha)
+
     merged = old_q.copy()
     for state, new_values in new_q.items():
         if state in merged:
@@ -18,52 +26,53 @@ def merge_q_tables(old_q, new_q, alpha=0.5):
     return merged
 
 
-def save_all_agents(agent_dict, path="q_tables/", shared=False):
-    os.makedirs(path, exist_ok=True)
-
-    for name, agent in agent_dict.items():
-        q_table = agent.q_table
+def agent_role(name, agent):
+    bunny = getattr(agent, "bunny", None)
+    if bunny is None:
+        btype = "unknown"
+    elif bunny.is_mutant:
+        btype = "vampire"
+    elif not bunny.is_adult():
+        btype = "juvenile"
+    elif bunny.sex == "M":
+        btype = "male"
+    else:
+        btype = "female"
 
-        if shared:
-            bunny = getattr(agent, "bunny", None)
-            if bunny is None:
-                btype = "unknown"
-            elif bunny.is_mutant:
-                btype = "vampire"
-            elif not bunny.is_adult():
-                btype = "juvenile"
-            elif bunny.sex == "M":
-                btype = "male"
-            else:
-                btype = "female"
+    if name.startswith("J"):
+        btype = "juvenile"
+    return btype
 
-            if name.startswith("J"):
-                btype = "juvenile"
 
-            filename = f"{btype}_shared.pkl"
-        else:
-            filename = f"{name}.pkl"
+def save_all_agents(agent_dict, path="q_tables/", shared=False):
+    os.makedirs(path, exist_ok=True)
 
+    # Agents of a role share one table object; merge each table into its file once
+    saved = set()
+    for key, agent in agent_dict.items():
+        name = getattr(key, "name", key)  # keyed by Bunny in FSMDispatcher.rl_agents
+        btype = agent_role(name, agent)
+        filename = f"{btype}_shared{QTABLE_EXT}" if shared else f"{name}{QTABLE_EXT}"
         file_path = os.path.join(path, filename)
 
-        if shared and os.path.exists(file_path):
-            try:
-                with open(file_path, "rb") as f:
-                    existing_q = pickle.load(f)
-                q_table = merge_q_tables(existing_q, q_table, alpha=0.5)
-            except Exception as e:
-                print(f"[WARN] Could not merge shared Q-table for {filename}: {e}")
+        key = (file_path, id(agent.q_table))
+        if key in saved:
+            continue
+        saved.add(key)
 
-        with open(file_path, "wb") as f:
-            pickle.dump(q_table, f)
-            print(f"[SAVE] {name} as {btype} ({len(q_table)} states)")
+        if shared:
+            q_table = merge_into_file(agent.q_table, file_path, alpha=0.5)
+        else:
+            q_table = agent.q_table
+            save_qtable(q_table, file_path)
+        print(f"[SAVE] {name} as {btype} ({len(q_table)} states)")
 
 
 def save_combined_qtables(agent_dict, path="q_tables/all_shared.pkl"):
     combined = {"male": {}, "female": {}, "juvenile": {}, "vampire": {}}
 
     for agent in agent_dict.values():
-        q_table = agent.q_table
+        q_table = as_dict(agent.q_table)
         bunny = getattr(agent, "bunny", None)
 
         if bunny is None:
@@ -89,33 +98,102 @@ def save_combined_qtables(agent_dict, path="q_tables/all_shared.pkl"):
                     (a + b) / 2.0 for a, b in zip(combined[role][state], values)
                 ]
 
-    with open(path, "wb") as f:
-        pickle.dump(combined, f)
+    atomic_write(path, lambda f: pickle.dump(combined, f))
 
     print(f"[SAVE] Combined Q-tables saved to {path}")
 
 
+def save_shared_tables(shared_tables, path="q_tables/", merge=False):
+    """Write each role's shared Q-table to {role}_shared.qtab.
+
+    The old file is replaced, or with merge=True blended in like save_all_agents(shared=True).
+    """
+    os.makedirs(path, exist_ok=True)
+    for role, q_table in shared_tables.items():
+        file_path = os.path.join(path, f"{role}_shared{QTABLE_EXT}")
+        if merge:
+            q_table = merge_into_file(q_table, file_path, alpha=0.5)
+        else:
+            save_qtable(q_table, file_path)
+        print(f"[SAVE] {role}_shared ({len(q_table)} states)")
+
+
 def load_agent_qtable(name, path="q_tables/"):
-    file_path = f"{path}{name}.pkl"
+    """Load a Q-table, preferring the binary .qtab over a legacy .pkl."""
+    table = load_qtable(os.path.join(path, f"{name}{QTABLE_EXT}"))
+    if table is not None:
+        return table
+
+    file_path = os.path.join(path, f"{name}.pkl")
     if os.path.exists(file_path):
         try:
             with open(file_path, "rb") as f:
-                return pickle.load(f)
-        except EOFError:
+                return as_qtable(pickle.load(f))
+        except (EOFError, pickle.UnpicklingError):
             print(f"[WARN] Q-table for {name} is empty or corrupted.")
             return None
     return None
 
+def get_states(role, bunnies, grid):
+    """Encoded BunnyRLAgent.get_state() for many bunnies of one role at once.
+
+    Every feature comes straight from the population columns and the grid
+    layers, neighbour checks included (see Grid.adjacent_adults).
+    """
+    pop = grid.population
+    ids = np.fromiter((b.id for b in bunnies), dtype=np.intp, count=len(bunnies))
+    xs, ys = pop.x[ids], pop.y[ids]
+    age_bin = np.minimum(pop.age[ids] // 3, 4)
+    vampire_near = grid.vampire_field.dist[xs, ys] <= 3
+    empty = grid.empty_neighbor_mask(ids).any(axis=1)
+
+    if role == "vampire":
+        columns = (age_bin, empty, vampire_near)
+    elif role == "juvenile":
+        columns = (age_bin, vampire_near, empty)
+    elif role == "female":
+        male_adj = grid.adjacent_adults(ids, "M")
+        columns = (age_bin, pop.has_baby[ids], vampire_near, male_adj, empty)
+    else:
+        female_adj = grid.adjacent_adults(ids, "F")
+        heat = grid.female_heatmap.values_at(xs, ys) > 1.0
+        columns = (age_bin, female_adj, vampire_near, heat, empty)
+    return encode_states(role, columns)
+
+
 class BunnyRLAgent:
+    # Print and snapshot juveniles that graduate to adults (off in training workers)
+    graduation_snapshots = True
+
     def __init__(self, bunny, shared_q_table):
-        self.bunny = bunny
-        self.q_table = shared_q_table
         self.epsilon = 0.5
         self.alpha = 0.2
         self.gamma = 0.95
+        # Optional core.experience.ExperienceBuffer every transition is written to
+        self.experience = None
+        self.reset(bunny, shared_q_table)
+
+    def reset(self, bunny, shared_q_table):
+        """Rebind a pooled agent to a new bunny, dropping the old trace."""
+        self.bunny = bunny
+        self.q_table = as_qtable(shared_q_table) if shared_q_table is not None else None
         self.last_state = None
         self.last_action = None
 
+    def finish(self, reward):
+        """The bunny died: fold the last transition into the table as a terminal update."""
+        if self.last_state is not None and self.last_action is not None:
+            s = encode_state(self.last_state)
+            self.q_table.update_terminal(s, self.last_action, reward, self.alpha)
+            if self.experience is not None:
+                self.experience.add(s, self.last_action, reward, s, done=True)
+        self.reset(None, None)
+
+    def record(self, s, a, r, s_prime):
+        """Write a transition to the experience buffer, if there is one."""
+        if self.experience is not None:
+            self.experience.add(encode_state(s), a, r, encode_state(s_prime))
+
     def num_actions(self):
         return 6  # 0–4: directions, 5: role action
 
@@ -142,7 +220,7 @@ class BunnyRLAgent:
             )
         else:  # male
             female_adj = any(b.sex == 'F' and b.is_adult() for b in adjacent)
-            heat = int(grid.female_heatmap.data[x][y] > 1.0)
+            heat = int(grid.female_heatmap.value(x, y) > 1.0)
             return (
                 'male',
                 age_bin,
@@ -153,27 +231,21 @@ class BunnyRLAgent:
             )
 
     def choose_action(self, state):
-        if state not in self.q_table:
-            self.q_table[state] = [0.0] * self.num_actions()
+        idx = encode_state(state)
+        self.q_table.visited[idx] = True
         if random.random() < self.epsilon:
             return random.randint(0, self.num_actions() - 1)
-        return max(range(self.num_actions()), key=lambda a: self.q_table[state][a])
+        return self.q_table.greedy(idx)
 
     def update_q(self, s, a, r, s_prime):
-        if s not in self.q_table:
-            self.q_table[s] = [0.0] * self.num_actions()
-        if s_prime not in self.q_table:
-            self.q_table[s_prime] = [0.0] * self.num_actions()
-
-        max_future = max(self.q_table[s_prime])
-        self.q_table[s][a] += self.alpha * (r + self.gamma * max_future - self.q_table[s][a])
+        self.q_table.update(encode_state(s), a, r, encode_state(s_prime), self.alpha, self.gamma)
 
 
     def act(self, action, grid):
         if action in range(5):
             dx, dy = [(0, -1), (0, 1), (1, 0), (-1, 0), (0, 0)][action]
             nx, ny = self.bunny.x + dx, self.bunny.y + dy
-            if 0 <= nx < grid.GRID_WIDTH and 0 <= ny < grid.GRID_HEIGHT and grid.cells[nx][ny] is None:
+            if grid.is_empty(nx, ny):
                 grid.move_bunny(self.bunny, nx, ny)
         elif action == 5:
             if self.bunny.is_mutant:
@@ -230,6 +302,7 @@ class BunnyRLAgent:
         reward = reward_func(self.bunny, grid)
         if self.last_state is not None and self.last_action is not None:
             self.update_q(self.last_state, self.last_action, reward, state)
+            self.record(self.last_state, self.last_action, reward, state)
         self.last_state = state
         self.last_action = action
 
@@ -237,14 +310,12 @@ class BunnyRLAgent:
             self.update_q(self.last_state, self.last_action, reward, state)
         
             # 🧠 Detect graduation from juvenile to adult
-            if self.last_state[0] == "juvenile" and state[0] in ("male", "female"):
+            if self.graduation_snapshots and self.last_state[0] == "juvenile" and state[0] in ("male", "female"):
                 print(f"[GRADUATED] {self.bunny.name} became {state[0]}")
                 self.save_juvenile_snapshot()
 
     
     def save_juvenile_snapshot(self, path="q_tables/juvenile_grads.pkl"):
-        if not isinstance(self.q_table, dict):
-            return
         if len(self.q_table) == 0:
             return
 
@@ -257,7 +328,7 @@ class BunnyRLAgent:
         else:
             combined = {}
 
-        for state, values in self.q_table.items():
+        for state, values in as_dict(self.q_table).items():
             if state[0] != "juvenile":
                 continue
             if state not in combined:
@@ -267,8 +338,7 @@ class BunnyRLAgent:
                     (a + b) / 2.0 for a, b in zip(combined[state], values)
                 ]
 
-        with open(path, "wb") as f:
-            pickle.dump(combined, f)
+        atomic_write(path, lambda f: pickle.dump(combined, f))
         print(f"[SAVE] Juvenile snapshot saved with {len(combined)} states")
 
 
@@ -0,0 +1,130 @@
+# core/scheduler.py
+#
+# Runs a Simulation on a worker thread at a fixed timestep, independent of
+# the frame rate, and hands the latest completed turn to the viewer.
+
+import threading
+import time
+
+TURN_SECONDS = 0.5    # one turn every 500 ms at 1x
+MAX_CATCH_UP = 5      # turns run back to back after a stall before the clock is reset
+
+SPEEDS = {"1x": 1.0, "10x": 10.0, "max": None}
+
+
+class Scheduler:
+    """Fixed-timestep driver for a Simulation.
+
+    speed is a multiplier of 1 turn per TURN_SECONDS (1.0, 10.0, ...) or
+    None for as fast as possible. With turns_per_frame=K the worker instead
+    runs exactly K turns for every frame() call, locking the pace to the
+    renderer. latest() returns the Snapshot of the last completed turn; the
+    worker only builds one when the viewer has asked for a new one, so fast
+    forwarding does not pay for snapshots nobody draws.
+
+    If a turn raises, the worker stops and the exception is re-raised on the
+    viewer's thread by the next latest() or stop() call.
+    """
+
+    def __init__(self, sim, speed=1.0, turns_per_frame=None, max_turns=None):
+        self.sim = sim
+        self.speed = speed
+        self.turns_per_frame = turns_per_frame
+        self.max_turns = max_turns
+
+        self._snapshot = sim.snapshot()
+        self._snapshot_wanted = False
+        self._lock = threading.Lock()
+        self._frame = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.finished = False
+        self.error = None
+
+    def set_speed(self, speed, turns_per_frame=None):
+        self.speed = speed
+        self.turns_per_frame = turns_per_frame
+        self._frame.set()  # wake a worker waiting for a frame
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="Scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._frame.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+    def frame(self):
+        """Called once per rendered frame; paces turns_per_frame mode."""
+        if self.turns_per_frame:
+            self._frame.set()
+
+    def latest(self):
+        """Snapshot of the most recent completed turn (may repeat between turns)."""
+        self._raise_error()
+        with self._lock:
+            self._snapshot_wanted = True
+            return self._snapshot
+
+    def _raise_error(self):
+        # Hand a worker exception to the calling thread, once
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    # --- worker thread ---
+
+    def _turn(self):
+        alive = self.sim.step()
+        done = not alive or (self.max_turns is not None and self.sim.turn >= self.max_turns)
+        if self._snapshot_wanted or done:
+            if self.sim.profiler is not None:
+                with self.sim.profiler.phase("snapshot"):
+                    snapshot = self.sim.snapshot()
+            else:
+                snapshot = self.sim.snapshot()
+            with self._lock:
+                self._snapshot = snapshot
+                self._snapshot_wanted = False
+        if done:
+            self.finished = True
+        return not done
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as error:
+            self.error = error
+            self.finished = True
+
+    def _loop(self):
+        next_turn = time.perf_counter()
+        while not self._stop.is_set() and not self.finished:
+            if self.turns_per_frame:
+                # Frames that arrive while the worker is busy are coalesced
+                self._frame.wait()
+                self._frame.clear()
+                for _ in range(self.turns_per_frame):
+                    if self._stop.is_set() or not self._turn():
+                        break
+                next_turn = time.perf_counter()
+                continue
+
+            if self.speed is None:
+                self._turn()
+                continue
+
+            timestep = TURN_SECONDS / self.speed
+            now = time.perf_counter()
+            if now < next_turn:
+                self._stop.wait(next_turn - now)
+                continue
+            if now - next_turn > MAX_CATCH_UP * timestep:
+                next_turn = now  # too far behind: drop the backlog instead of spiralling
+            self._turn()
+            next_turn += timestep
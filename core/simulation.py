@@ -0,0 +1,133 @@
+# core/simulation.py
+
+import random
+from contextlib import nullcontext
+from core.grid import Grid
+from core.fsm_dispatcher import FSMDispatcher
+
+
+class Snapshot:
+    """What a viewer needs from one completed turn, copied out of the live world.
+
+    Safe to read from another thread while the simulation keeps running.
+    """
+
+    def __init__(self, sim):
+        grid = sim.grid
+        self.world = id(grid)
+        self.turn = sim.turn
+        self.tiles = grid.raster.tile_keys(grid.population)  # see OccupancyRaster.tile_keys
+        self.counts = grid.population.role_counts()
+        self.population = len(grid.bunnies)
+        self.max_population = sim.max_population
+        self.avg_reward = sim.avg_reward
+        self.extinct = sim.extinct
+
+
+_NO_PHASE = nullcontext()
+
+
+def _no_phase(name):
+    return _NO_PHASE
+
+
+class Simulation:
+    """Headless turn engine.
+
+    Owns the Grid, the FSMDispatcher and the turn loop. Nothing in here touches
+    pygame: rendering, HUDs and any other per-turn consumers attach as observers
+    and are called with the simulation after every completed turn.
+    """
+
+    def __init__(self, grid=None, dispatcher=None, mode="FSM", logger=None, seed=None, profiler=None):
+        # Seeding happens first so the initial spawn is reproducible too
+        self.seed = seed
+        if seed is not None:
+            random.seed(seed)
+        self.grid = grid if grid is not None else Grid()
+        self.dispatcher = dispatcher if dispatcher is not None else FSMDispatcher(mode=mode)
+        self.logger = logger
+        self.observers = []
+        # Optional core.profiler.TurnProfiler timing each phase of step()
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self.grid)
+            self.dispatcher.profiler = profiler
+
+        self.turn = 0
+        self.total_reward = 0
+        self.avg_reward = 0
+        self.max_population = len(self.grid.bunnies)
+
+    def add_observer(self, observer):
+        """Attach a callable invoked as observer(sim) after every turn."""
+        self.observers.append(observer)
+        return observer
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def snapshot(self):
+        return Snapshot(self)
+
+    @property
+    def extinct(self):
+        return not self.grid.bunnies
+
+    def step(self):
+        """Run a single turn. Returns False once the colony is extinct."""
+        grid = self.grid
+        self.turn += 1
+        phase = self.profiler.phase if self.profiler is not None else _no_phase
+
+        # Update heatmap before agent logic
+        with phase("heatmap"):
+            if grid.female_heatmap:
+                grid.female_heatmap.decay()
+                grid.female_heatmap.update_from_population(grid.population)
+
+        # The turn's bunnies, fixed without a copy; births and deaths during
+        # the turn are folded into grid.bunnies once it thaws
+        bunnies = grid.bunnies.freeze()
+        try:
+            # Age the whole population at once; bunnies past their max age leave
+            # the grid but are still dispatched below so they see the death penalty
+            with phase("aging"):
+                for bunny in grid.population.advance_age():
+                    grid.remove_bunny(bunny)
+                    if self.logger:
+                        self.logger.log(self.turn, "death", bunny, "natural causes", controller="FSM")
+
+            with phase("dispatch"):
+                total_reward = self.dispatcher.update_bunnies(bunnies, grid, self.turn, self.logger)
+        finally:
+            grid.bunnies.thaw()
+
+        with phase("stats"):
+            self.total_reward = total_reward
+            self.avg_reward = total_reward / len(grid.bunnies) if grid.bunnies else 0
+            self.max_population = max(self.max_population, len(grid.bunnies))
+
+            if self.logger:
+                self.logger.end_turn(self.turn)
+
+        with phase("observers"):
+            for observer in self.observers:
+                observer(self)
+
+        if self.profiler is not None:
+            self.profiler.end_turn(self)
+
+        return not self.extinct
+
+    def run(self, turns=None):
+        """Run up to `turns` turns (unbounded if None) or until extinction.
+
+        Returns the number of turns actually run.
+        """
+        start = self.turn
+        while turns is None or self.turn - start < turns:
+            if not self.step():
+                break
+        return self.turn - start
@@ -0,0 +1,119 @@
+# core/trainer.py
+
+import copy
+import random
+import time
+from multiprocessing import Pool
+import numpy as np
+
+from core.grid import Grid, GRID_WIDTH, GRID_HEIGHT
+from core.fsm_dispatcher import FSMDispatcher
+from core.simulation import Simulation
+from core.rl_agent import BunnyRLAgent, load_agent_qtable
+from core.population import ROLES
+from core.qtable import as_qtable
+
+
+def load_shared_tables(path="q_tables/"):
+    return {role: as_qtable(load_agent_qtable(f"{role}_shared", path=path)) for role in ROLES}
+
+
+def merge_worker_tables(base, worker_tables):
+    """Average the workers' tables role by role.
+
+    Every state gets the plain mean of the workers that have it (a worker
+    has every state of the `base` it started from), so the result does not
+    depend on the order of the workers. States no worker has keep their
+    base values.
+    """
+    merged = {}
+    for role, table in base.items():
+        role_table = as_qtable(table).copy()
+        total = np.zeros(role_table.q.shape, dtype=np.float64)
+        visits = np.zeros(len(role_table.visited), dtype=np.int64)
+        for tables in worker_tables:
+            worker = as_qtable(tables[role])
+            total[worker.visited] += worker.q[worker.visited]
+            visits += worker.visited
+        seen = visits > 0
+        role_table.q[seen] = total[seen] / visits[seen, None]
+        role_table.visited |= seen
+        merged[role] = role_table
+    return merged
+
+
+def _init_worker():
+    # Workers share q_tables/ with each other; keep them from writing snapshots
+    BunnyRLAgent.graduation_snapshots = False
+
+
+def run_episodes(job):
+    """Worker entry point: run a block of episodes on one copy of the shared tables.
+
+    `job` is (episodes, shared_tables, config). Each episode is seeded with
+    config["seed"] + its episode number, so results do not depend on which
+    process ran it.
+    """
+    episodes, shared_tables, config = job
+    stats = []
+    for episode in episodes:
+        random.seed(config["seed"] + episode)
+        grid = Grid(width=config["width"], height=config["height"])
+        dispatcher = FSMDispatcher(mode=config["mode"], shared_tables=shared_tables,
+                                   batched=config["batched"])
+        sim = Simulation(grid=grid, dispatcher=dispatcher)
+        sim.run(config["max_turns"])
+        shared_tables = dispatcher.shared_tables
+        stats.append({"episode": episode, "turns": sim.turn, "max_population": sim.max_population})
+    return shared_tables, stats
+
+
+def train(episodes=500, workers=4, max_turns=1000, sync_every=5, mode="RL",
+          seed=0, width=GRID_WIDTH, height=GRID_HEIGHT, batched=False, shared_tables=None):
+    """Run `episodes` headless episodes across a process pool.
+
+    Each worker runs `sync_every` episodes on its own copy of the shared
+    tables, then all copies are merged (see merge_worker_tables) and
+    redistributed. Returns (shared_tables, per-episode stats).
+    """
+    if shared_tables is None:
+        shared_tables = load_shared_tables()
+    config = {"mode": mode, "max_turns": max_turns, "seed": seed,
+              "width": width, "height": height, "batched": batched}
+    workers = max(1, workers)
+
+    pool = Pool(workers, initializer=_init_worker) if workers > 1 else None
+    if pool is None:
+        _init_worker()
+
+    all_stats = []
+    start = time.perf_counter()
+    try:
+        next_episode = 0
+        while next_episode < episodes:
+            round_size = min(workers * sync_every, episodes - next_episode)
+            jobs = []
+            for w in range(workers):
+                block = range(next_episode + w * sync_every,
+                              min(next_episode + (w + 1) * sync_every, next_episode + round_size))
+                if len(block):
+                    # Pool workers get a pickled copy; inline runs need their own
+                    tables = shared_tables if pool else copy.deepcopy(shared_tables)
+                    jobs.append((block, tables, config))
+            next_episode += round_size
+
+            results = pool.map(run_episodes, jobs) if pool else [run_episodes(job) for job in jobs]
+
+            shared_tables = merge_worker_tables(shared_tables, [tables for tables, _ in results])
+            for _, stats in results:
+                all_stats.extend(stats)
+
+            elapsed = time.perf_counter() - start
+            print(f"[TRAIN] {next_episode}/{episodes} episodes "
+                  f"({next_episode / elapsed:.2f} episodes/s)")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return shared_tables, all_stats
@@ -1,89 +1,69 @@
 # main.py
 
-import pygame
-import time
-from core.grid import Grid, SCREEN_WIDTH, SCREEN_HEIGHT
-from core.fsm_dispatcher import FSMDispatcher
+import argparse
+from core.simulation import Simulation
+from core.renderer import PygameRenderer
+from core.scheduler import Scheduler, SPEEDS
 from core.logger import EventLogger
-from core.rl_agent import save_all_agents
+from core.profiler import TurnProfiler
+from core.rl_agent import save_shared_tables
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Bunny Simulator")
-
-    grid = Grid(screen)
-    dispatcher = FSMDispatcher(mode="RL")  # FSM or RL
-    #logger = EventLogger()
-
-    font = pygame.font.SysFont(None, 24)
-    clock = pygame.time.Clock()
-
-    turn = 0
-    max_population = 0
-
-    running = True
-    while running:
-        clock.tick(60)  # max frame rate
-        fps = clock.get_fps()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
 
-        # Simulation step every 500ms
-        if turn == 0 or pygame.time.get_ticks() % 500 < 20:
-            turn += 1            
-                    
-            # Update heatmap before agent logic
-            if grid.female_heatmap:
-                grid.female_heatmap.decay()
-                grid.female_heatmap.update_from_sightings(grid.bunnies)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Watch a bunny colony")
+    parser.add_argument("--mode", choices=["FSM", "RL", "GNN"], default="RL")
+    parser.add_argument("--speed", choices=sorted(SPEEDS), default="1x",
+                        help="turns per 500 ms (1x, 10x) or as fast as possible (max)")
+    parser.add_argument("--turns-per-frame", type=int, default=None,
+                        help="run exactly K turns per rendered frame instead of a fixed timestep")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="write per-phase turn timings to PATH (.csv, otherwise JSON lines)")
+    parser.add_argument("--profile-every", type=int, default=100, metavar="N",
+                        help="turns summarised per profile row")
+    return parser.parse_args()
 
-            total_reward = 0
-            bunnies = list(grid.bunnies)  # avoid mutation during loop
-            for bunny in bunnies:
-                bunny.update(grid, turn)
-                reward, _ = dispatcher.update_bunny(bunny, grid, turn)
-                total_reward += reward  
 
-            avg_reward = total_reward / len(grid.bunnies) if grid.bunnies else 0
-    
-                
+def main():
+    args = parse_args()
+    profiler = TurnProfiler(args.profile, every=args.profile_every) if args.profile else None
+    sim = Simulation(mode=args.mode, seed=args.seed, profiler=profiler)
+    #sim.logger = EventLogger()
+
+    renderer = PygameRenderer(sim.grid)
+    # The simulation runs on a worker thread; this loop only draws its latest turn
+    scheduler = Scheduler(sim, speed=SPEEDS[args.speed], turns_per_frame=args.turns_per_frame).start()
+
+    drawn = None
+    try:
+        while renderer.poll_events():
+            renderer.tick(60)  # max frame rate
+            scheduler.frame()
+            snapshot = scheduler.latest()  # re-raises a crash of the simulation thread
+            if snapshot is not drawn:
+                if profiler is not None:
+                    with profiler.phase("render"):
+                        renderer.draw(snapshot)
+                else:
+                    renderer.draw(snapshot)
+                drawn = snapshot
             # Check for extinction
-            if not grid.bunnies:
-                print(f"Simulation ended at turn {turn} — all bunnies are gone.")
-                running = False
+            if snapshot.extinct:
+                print(f"Simulation ended at turn {snapshot.turn} — all bunnies are gone.")
                 break
-            
-            # Draw grid and bunnies
-            grid.update()
-
-            # --- HUD Metrics ---
-            adults = sum(1 for b in grid.bunnies if b.is_adult)
-            mutants = sum(1 for b in grid.bunnies if b.is_mutant)
-            max_population = max(max_population, len(grid.bunnies))
-            fps_display = f"{fps:.1f}" if fps > 1.0 else "--"
-
-            hud = [
-                f"Turn: {turn}",
-                f"FPS: {fps_display}",
-                f"Bunnies: {len(grid.bunnies)} (Adults: {adults}, Mutants: {mutants})",
-                f"Max Population: {max_population}",
-                f"Avg Reward: {avg_reward:.2f}",
-            ]
-
-            for i, line in enumerate(hud):
-                text = font.render(line, True, (255, 255, 255))
-                screen.blit(text, (10, 10 + i * 20))
-
-        pygame.display.flip()
-
-    #logger.close()
-    
-    pygame.quit()
-    
-    save_all_agents(dispatcher.rl_agents, shared=True)
+    finally:
+        try:
+            scheduler.stop()  # also re-raises a crash the loop has not seen yet
+        finally:
+            if profiler is not None:
+                profiler.close(sim.turn)
+                print(f"[INFO] Turn profile written to {args.profile}")
+            #sim.logger.close()
+
+            renderer.close()
+
+    # Only live bunnies keep agents, so save the role tables every agent wrote into
+    save_shared_tables(sim.dispatcher.shared_tables, merge=True)
     print("[INFO] RL agents saved.")
     #bunnies_trained_population = 15  # Example threshold for trained bunnies
     #if max_population >= bunnies_trained_population:
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from benchmarks import run
+from benchmarks.scenarios import Scenario, MODES
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_tiny_scenario_runs_and_reports_every_metric(monkeypatch, tmp_path, mode):
+    monkeypatch.setattr(run, "MIN_SECONDS", 0.0)
+    scenario = Scenario(20, mode, turns=3)
+    result = run.measure(scenario, repeat=1)
+    assert result["turns"] == 3 and result["final_population"] == 20
+    for metric in run.METRICS:
+        assert result[metric] > 0
+
+    path = str(tmp_path / "baselines" / "tiny.json")
+    run.save_baseline(path, "tiny", {scenario.name: result}, [scenario])
+    baseline = run.load_baseline(path)
+    assert run.compare({scenario.name: result}, baseline, 0.2) == []
+    slower = dict(result, turns_per_s=result["turns_per_s"] / 2)
+    assert [r[1] for r in run.compare({scenario.name: slower}, baseline, 0.2)] == ["turns_per_s"]
+
+
+def test_pinned_scenarios_are_reproducible_and_keep_their_size():
+    def positions(scenario):
+        sim = scenario.build()
+        sizes = []
+        for _ in range(12):  # past MAX_AGE, when every starting bunny has died of age
+            sim.step()
+            sizes.append(len(sim.grid.bunnies))
+        pop = sim.grid.population
+        ids = pop.alive_ids()
+        return sizes, pop.x[ids], pop.y[ids]
+
+    sizes, x, y = positions(Scenario(50, "FSM", seed=3))
+    assert sizes == [50] * 12
+    again = positions(Scenario(50, "FSM", seed=3))
+    np.testing.assert_array_equal(x, again[1])
+    np.testing.assert_array_equal(y, again[2])
@@ -0,0 +1,33 @@
+import numpy as np
+
+from benchmarks.scenarios import Scenario
+from core.bunny_graph import BunnyGraph, GRAPH_RADIUS
+
+
+def edge_list(ids, edge_index):
+    return sorted(zip(ids[edge_index[0]].tolist(), ids[edge_index[1]].tolist()))
+
+
+def brute_force_edges(pop):
+    ids = pop.alive_ids()
+    x, y = pop.x[ids].astype(int), pop.y[ids].astype(int)
+    dist = np.abs(x[:, None] - x[None, :]) + np.abs(y[:, None] - y[None, :])
+    src, dst = np.nonzero((dist > 0) & (dist <= GRAPH_RADIUS))
+    return sorted(zip(ids[src].tolist(), ids[dst].tolist()))
+
+
+def test_incremental_edges_match_a_rebuild():
+    sim = Scenario(300, "FSM", 0.1, size=(40, 40), seed=2).build()
+    incremental = BunnyGraph(sim.grid, rebuild_fraction=float("inf"))  # never rebuilds after the first
+    rebuilt = BunnyGraph(sim.grid, rebuild_fraction=-1)                 # always rebuilds
+    for turn in range(15):
+        sim.step()
+        if turn % 3 == 2:
+            continue  # let changes from several turns pile up between builds
+        ids, features, edges = incremental.build()
+        ids_full, features_full, edges_full = rebuilt.build()
+        np.testing.assert_array_equal(ids, ids_full)
+        np.testing.assert_array_equal(features, features_full)
+        expected = brute_force_edges(sim.grid.population)
+        assert edge_list(ids_full, edges_full) == expected
+        assert edge_list(ids, edges) == expected  # no stale or duplicated edges either
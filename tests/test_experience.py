@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from core.experience import ExperienceBuffer, load_experience
+
+
+def rows(start, n):
+    s = np.arange(start, start + n)
+    return s, s % 6, s * 0.5, s + 1, s % 7 == 0
+
+
+def fill(buffer, rng, n_rows):
+    added = 0
+    while added < n_rows:
+        n = int(rng.choice([1, 3, 16, 40, 130]))  # single rows, small batches and batches past capacity
+        s, a, r, s_prime, done = rows(added, n)
+        if n == 1:
+            buffer.add(int(s[0]), int(a[0]), float(r[0]), int(s_prime[0]), bool(done[0]))
+        else:
+            buffer.add_batch(s, a, r, s_prime, done)
+        added += n
+    return added
+
+
+def check(data, start, n):
+    s, a, r, s_prime, done = rows(start, n)
+    np.testing.assert_array_equal(data["s"], s)
+    np.testing.assert_array_equal(data["a"], a)
+    np.testing.assert_array_equal(data["r"], r)
+    np.testing.assert_array_equal(data["s_prime"], s_prime)
+    np.testing.assert_array_equal(data["done"], done)
+
+
+@pytest.mark.parametrize("spill", [False, True])
+def test_ring_keeps_the_latest_rows_and_spills_the_whole_history(tmp_path, spill):
+    spill_dir = str(tmp_path / "experience") if spill else None
+    buffer = ExperienceBuffer(capacity=50, spill_dir=spill_dir, chunk_size=16)
+    total = fill(buffer, np.random.default_rng(0), 1000)
+    assert buffer.total == total and len(buffer) == 50
+    check(buffer.transitions(), total - 50, 50)
+    if spill:
+        buffer.flush()
+        check(load_experience(spill_dir), 0, total)
+
+
+def test_a_new_buffer_appends_to_existing_chunks(tmp_path):
+    spill_dir = str(tmp_path / "experience")
+    first = ExperienceBuffer(capacity=50, spill_dir=spill_dir, chunk_size=16)
+    first.add_batch(*rows(0, 40))
+    first.flush()
+    second = ExperienceBuffer(capacity=50, spill_dir=spill_dir, chunk_size=16)
+    second.add_batch(*rows(40, 25))
+    second.flush()
+    check(load_experience(spill_dir), 0, 65)
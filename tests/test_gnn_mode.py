@@ -0,0 +1,35 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+from benchmarks.scenarios import Scenario
+from core.bunny_gnn import BunnyGNNPolicy
+from core.fsm_dispatcher import FSMDispatcher
+from core.population import ROLES
+from core.simulation import Simulation
+
+
+class CountingPolicy(BunnyGNNPolicy):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def forward(self, data):
+        self.calls.append(data.x.shape[0])
+        return super().forward(data)
+
+
+def test_gnn_mode_runs_one_forward_pass_per_turn():
+    torch.manual_seed(0)
+    sim = Scenario(60, "FSM", 0.1, seed=4).build()
+    policy = CountingPolicy().eval()
+    dispatcher = FSMDispatcher(mode="GNN", gnn_policy=policy, shared_tables={role: {} for role in ROLES})
+    sim = Simulation(grid=sim.grid, dispatcher=dispatcher)
+    turns = sim.run(5)
+    assert turns > 0 and len(policy.calls) == turns
+    if not sim.extinct:
+        # Cached scores cover the population as it was at the start of the last turn
+        assert dispatcher.gnn_scores.shape == (policy.calls[-1], 3)
+        actions = {dispatcher.gnn_action(b, sim.grid) for b in sim.grid.bunnies}
+        assert actions - {None} and actions <= {None, 0, 1, 2}
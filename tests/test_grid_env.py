@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("gym")
+
+from core.grid_env import BunnyEnv, VecBunnyEnv
+from core.population import ROLES, MAX_AGE
+
+
+def empty_tables():
+    return {role: {} for role in ROLES}
+
+
+def brute_force_observation(grid):
+    obs = np.zeros((grid.width, grid.height), dtype=np.int8)
+    for bunny in grid.bunnies:
+        obs[bunny.x, bunny.y] = grid.population.role_of(bunny.id) + 1
+    return obs
+
+
+def test_dispatcher_leaves_the_focal_bunny_alone():
+    env = BunnyEnv(grid_size=20, max_turns=50, seed=3, shared_tables=empty_tables(), respawn=False)
+    obs = env.reset()
+    assert obs.dtype == np.int8 and obs.shape == (20, 20)
+    np.testing.assert_array_equal(obs, brute_force_observation(env.sim.grid))
+    agent = env.agent
+    assert agent.age == 0 and agent.controlled
+    done = False
+    while not done:
+        x, y = agent.x, agent.y
+        obs, reward, done, info = env.step(0)
+        if not info["agent_died"]:
+            assert (agent.x, agent.y) == (x, y)
+            np.testing.assert_array_equal(obs, brute_force_observation(env.sim.grid))
+    assert info["agent_died"] or env.sim.extinct or env.sim.turn == 50
+
+
+def test_respawn_keeps_the_episode_going():
+    env = BunnyEnv(grid_size=20, max_turns=200, seed=1, shared_tables=empty_tables())
+    env.reset()
+    turns = deaths = 0
+    done = False
+    while not done:
+        _, reward, done, info = env.step(env.action_space.sample())
+        turns += 1
+        deaths += info["agent_died"]
+        assert isinstance(reward, float)
+        if not done:
+            assert env.agent._pop is env.sim.grid.population
+    assert deaths >= 1 and turns > MAX_AGE + 1
+
+
+def test_vec_env_stacks_and_resets_worlds():
+    vec = VecBunnyEnv(3, grid_size=12, max_turns=4, seed=0, shared_tables=empty_tables())
+    obs = vec.reset()
+    assert obs.shape == (3, 12, 12) and obs.dtype == np.int8
+    for turn in range(4):
+        obs, rewards, dones, infos = vec.step([1, 2, 0])
+        assert rewards.dtype == np.float32 and dones.dtype == bool and len(infos) == 3
+        for env, world in zip(vec.envs, obs):
+            np.testing.assert_array_equal(world, brute_force_observation(env.sim.grid))
+    # max_turns ends every episode on the fourth step; each world was reset
+    assert dones.all()
+    assert all(info["terminal_observation"].shape == (12, 12) for info in infos)
+    assert all(env.sim.turn == 0 for env in vec.envs)
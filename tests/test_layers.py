@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.scenarios import Scenario
+from core.layers import VampireField, DensityLayer
+
+W, H = 150, 90  # not a multiple of the tile size
+
+
+def brute_force_distance(vampires, far):
+    xs, ys = np.meshgrid(np.arange(W), np.arange(H), indexing="ij")
+    dist = np.full((W, H), far)
+    for x, y in vampires:
+        dist = np.minimum(dist, np.abs(xs - x) + np.abs(ys - y))
+    return dist
+
+
+def test_vampire_field_matches_a_brute_force_scan():
+    rng = np.random.default_rng(0)
+    field = VampireField(W, H, cap=8)
+    vampires = []
+    for step in range(300):
+        if vampires and rng.random() < 0.4:
+            x, y = vampires.pop(rng.integers(len(vampires)))
+            field.remove(x, y)
+        else:
+            # Cluster near the corners and edges, where the windows are clipped
+            x = int(rng.choice([rng.integers(0, 5), rng.integers(0, W), rng.integers(W - 5, W)]))
+            y = int(rng.choice([rng.integers(0, 5), rng.integers(0, H), rng.integers(H - 5, H)]))
+            field.add(x, y)
+            vampires.append((x, y))
+        if step % 25 == 0:
+            expected = brute_force_distance(vampires, field.far)
+            np.testing.assert_array_equal(field.dist.to_dense(), expected)
+            for x, y in zip(rng.integers(0, W, 40), rng.integers(0, H, 40)):
+                d = expected[x, y]
+                assert field.nearest(x, y, 4) == (d if d <= 4 else None)
+
+
+def test_simulated_vampire_field_matches_the_population():
+    sim = Scenario(400, "RL-batched", 0.1, size=(W, H), seed=1).build()
+    for _ in range(6):
+        sim.step()
+        grid, pop = sim.grid, sim.grid.population
+        ids = pop.alive_ids()
+        vampires = ids[pop.mutant[ids]]
+        expected = brute_force_distance(zip(pop.x[vampires], pop.y[vampires]), grid.vampire_field.far)
+        np.testing.assert_array_equal(grid.vampire_field.dist.to_dense(), expected)
+
+
+def test_density_window_sums_match_a_brute_force_sum():
+    rng = np.random.default_rng(2)
+    layer = DensityLayer(W, H)
+    dense = np.zeros((W, H), dtype=int)
+    for step in range(2000):
+        x, y = int(rng.integers(0, W)), int(rng.integers(0, H))
+        bunny = SimpleNamespace(x=x, y=y, is_mutant=False)
+        if dense[x, y] and rng.random() < 0.3:
+            layer.on_remove(bunny)
+            dense[x, y] -= 1
+        else:
+            layer.on_place(bunny)
+            dense[x, y] += 1
+        if step % 100 == 0:
+            # Windows of every size, spanning tile borders and the grid edges
+            for _ in range(30):
+                x0, y0 = rng.integers(-10, W), rng.integers(-10, H)
+                x1, y1 = x0 + rng.integers(0, 120), y0 + rng.integers(0, 120)
+                expected = dense[max(0, x0):max(0, x1), max(0, y0):max(0, y1)].sum()
+                assert layer.window_sum(x0, x1, y0, y1) == expected
+    np.testing.assert_array_equal(layer.density.to_dense(), dense)
+
+
+def test_simulated_density_matches_the_population():
+    sim = Scenario(400, "FSM", 0.1, size=(W, H), seed=4).build()
+    rng = np.random.default_rng(0)
+    for _ in range(6):
+        sim.step()
+        grid, pop = sim.grid, sim.grid.population
+        ids = pop.alive_ids()
+        bunnies = ids[~pop.mutant[ids]]
+        dense = np.zeros((W, H), dtype=int)
+        np.add.at(dense, (pop.x[bunnies], pop.y[bunnies]), 1)
+        np.testing.assert_array_equal(grid.get_bunny_density_map(), dense)
+        for x, y, r in zip(rng.integers(0, W, 40), rng.integers(0, H, 40), rng.choice([0, 2, 5, 70], 40)):
+            assert grid.density_around(x, y, r) == dense[max(0, x - r):x + r + 1, max(0, y - r):y + r + 1].sum()
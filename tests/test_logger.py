@@ -0,0 +1,54 @@
+import csv
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from core.logger import EventLogger
+
+BUNNY = SimpleNamespace(name="Bun", age=3, x=4, y=5)
+
+
+def read_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_background_writer_keeps_every_row_in_order(tmp_path):
+    with EventLogger(str(tmp_path), flush_every=7, background=True, max_pending=2) as logger:
+        for turn in range(50):
+            for i in range(3):
+                logger.log(turn, "move", BUNNY, str(i))
+            logger.end_turn(turn)
+    assert logger.file is None
+    rows = read_rows(logger.path)
+    assert [(int(r[0]), r[5]) for r in rows] == [(t, str(i)) for t in range(50) for i in range(3)]
+
+
+def test_producer_blocks_when_the_writer_falls_behind(tmp_path):
+    logger = EventLogger(str(tmp_path), flush_every=1, background=True, max_pending=2)
+    gate = threading.Event()
+    handle = logger._handle
+    logger._handle = lambda item: (gate.wait(), handle(item))
+    producer = threading.Thread(target=lambda: [logger.log(t, "move", BUNNY, "") for t in range(10)])
+    producer.start()
+    producer.join(0.2)
+    assert producer.is_alive() and logger._queue.full()
+    gate.set()
+    producer.join()
+    logger.close()
+    assert len(read_rows(logger.path)) == 10
+
+
+def test_writer_errors_surface_on_close(tmp_path):
+    logger = EventLogger(str(tmp_path), background=True)
+
+    def broken(item):
+        raise OSError("disk full")
+
+    logger._handle = broken
+    logger.log(0, "move", BUNNY, "")
+    logger.flush()
+    with pytest.raises(OSError, match="disk full"):
+        logger.close()
+    logger.close()  # already closed; nothing left to raise
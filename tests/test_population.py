@@ -0,0 +1,101 @@
+import random
+
+import numpy as np
+
+from core.bunny import Bunny
+from core.population import Population, BunnyList, ROLES, ADULT_AGE
+
+
+def expected_role(bunny):
+    if bunny.is_mutant:
+        return "vampire"
+    if bunny.age < ADULT_AGE:
+        return "juvenile"
+    return "female" if bunny.sex == "F" else "male"
+
+
+def check(pop, live):
+    assert len(pop) == len(live)
+    assert sorted(pop.alive_ids().tolist()) == sorted(b.id for b in live)
+    assert pop.adults == sum(b.age >= ADULT_AGE for b in live)
+    counts = pop.role_counts()
+    for role in ROLES:
+        assert counts[role] == sum(expected_role(b) == role for b in live)
+    for b in live:
+        assert pop.views[b.id] is b
+        assert ROLES[pop.role_of(b.id)] == expected_role(b)
+
+
+def test_add_release_and_updates_match_the_bunnies():
+    rng = random.Random(0)
+    pop = Population(capacity=4)
+    live, released = [], []
+    for step in range(600):
+        op = rng.random()
+        if op < 0.45 or not live:
+            b = Bunny(f"b{step}", rng.choice("MF"), rng.randrange(50), rng.randrange(50),
+                      age=rng.randrange(4), mutant=rng.random() < 0.1)
+            pop.add(b)
+            live.append(b)
+        elif op < 0.75:
+            b = live.pop(rng.randrange(len(live)))
+            values = (b.x, b.y, b.age, b.sex, b.is_mutant, b.state, b.has_baby)
+            pop.release(b)
+            assert b.id is None and (b.x, b.y, b.age, b.sex, b.is_mutant, b.state, b.has_baby) == values
+            released.append((b, values))
+        elif op < 0.9:
+            b = rng.choice(live)
+            b.age = rng.randrange(4)
+            b.state = rng.choice(["IDLE", "SEEK_MATE", "FLEE"])
+        else:
+            rng.choice(live).is_mutant = True
+        check(pop, live)
+    # Rows are recycled, so the store only grows to the peak live count
+    assert pop.size <= pop.capacity and pop.size < 600
+    for b, values in released:
+        assert (b.x, b.y, b.age, b.sex, b.is_mutant, b.state, b.has_baby) == values
+
+
+def test_advance_age_returns_the_expired_bunnies():
+    pop = Population()
+    bunnies = [Bunny(f"b{i}", "MF"[i % 2], i, 0, age=i % 12, mutant=i % 5 == 0) for i in range(60)]
+    for b in bunnies:
+        pop.add(b)
+    expired = pop.advance_age()
+    assert set(map(id, expired)) == {id(b) for b in bunnies if b.age > b.max_age()}
+    assert pop.adults == sum(b.age >= ADULT_AGE for b in bunnies)
+    assert not np.any(pop.has_baby)
+
+
+def test_bunny_list_swap_remove_and_frozen_compaction():
+    rng = random.Random(1)
+    pop, bunnies = Population(), BunnyList()
+    expected = []
+    frozen = None
+    for step in range(3000):
+        op = rng.random()
+        if op < 0.5 or not expected:
+            b = Bunny(f"b{step}", "M", 0, 0)
+            pop.add(b)
+            bunnies.append(b)
+            expected.append(b)
+        elif op < 0.9:
+            b = expected.pop(rng.randrange(len(expected)))
+            bunnies.remove(b)
+            pop.release(b)  # its row and id get recycled by later adds
+        elif frozen is None:
+            snapshot = list(bunnies)
+            frozen = bunnies.freeze()
+        else:
+            # The view still holds every bunny present at freeze time
+            assert list(frozen) == snapshot and len(frozen) == len(snapshot)
+            bunnies.thaw()
+            frozen = None
+        assert len(bunnies) == len(expected)
+        assert set(map(id, bunnies)) == set(map(id, expected))
+        assert all(b in bunnies for b in expected)
+    if frozen is not None:
+        bunnies.thaw()
+    # Once thawed the storage is compact: no dead slots left behind
+    assert len(bunnies._items) == len(expected) and all(bunnies._alive)
+    assert all(bunnies._items[pos].id == key for key, pos in bunnies._pos.items())
@@ -0,0 +1,59 @@
+import os
+import stat
+
+import numpy as np
+
+from core.qtable import QTable, N_STATES, N_ACTIONS, save_qtable, load_qtable
+
+
+def scalar_loop(table, s, a, r, s_prime, alpha, gamma):
+    for args in zip(s.tolist(), a.tolist(), r.tolist(), s_prime.tolist()):
+        table.update(*args, alpha, gamma)
+
+
+def test_repeated_transition_matches_scalar_loop():
+    batched, scalar = QTable(), QTable()
+    batched.q[7, 2] = scalar.q[7, 2] = 200.0
+    n = 1000
+    s, a = np.full(n, 7), np.full(n, 2)
+    r, s_prime = np.full(n, -5.0, dtype=np.float32), np.full(n, 11)
+    for _ in range(4):
+        batched.update_batch(s, a, r, s_prime, alpha=0.2, gamma=0.95)
+        scalar_loop(scalar, s, a, r, s_prime, alpha=0.2, gamma=0.95)
+    np.testing.assert_allclose(batched.q, scalar.q, rtol=1e-5, atol=1e-4)
+    assert abs(batched.q[7, 2]) < 200.0
+
+
+def test_mixed_batch_matches_scalar_loop():
+    rng = np.random.default_rng(0)
+    batched, scalar = QTable(), QTable()
+    batched.q[:] = scalar.q[:] = rng.normal(size=(N_STATES, N_ACTIONS)).astype(np.float32)
+    n = 500
+    # Few distinct (s, a) pairs so most of them repeat; next states never
+    # overlap the updated states, where the scalar loop would bootstrap from
+    # values the batch has not applied yet
+    s = rng.integers(0, 10, n)
+    a = rng.integers(0, N_ACTIONS, n)
+    r = rng.normal(size=n).astype(np.float32)
+    s_prime = rng.integers(10, N_STATES, n)
+    batched.update_batch(s, a, r, s_prime, alpha=0.2, gamma=0.95)
+    scalar_loop(scalar, s, a, r, s_prime, alpha=0.2, gamma=0.95)
+    np.testing.assert_allclose(batched.q, scalar.q, rtol=1e-5, atol=1e-5)
+    assert np.array_equal(batched.visited, scalar.visited)
+
+
+def test_saved_files_get_open_permissions(tmp_path):
+    path = str(tmp_path / "male_shared.qtab")
+    old_umask = os.umask(0o022)
+    try:
+        save_qtable(QTable(), path)
+    finally:
+        os.umask(old_umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    os.chmod(path, 0o640)
+    table = QTable()
+    table.q[3, 1] = 2.5
+    save_qtable(table, path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert load_qtable(path, mmap=False).q[3, 1] == 2.5
+    assert os.listdir(tmp_path) == ["male_shared.qtab"]
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+from benchmarks.scenarios import Scenario
+from core.grid import TILE_SIZE
+from core.renderer import PygameRenderer
+from core.scheduler import Scheduler
+
+
+@pytest.fixture
+def world():
+    sim = Scenario(30, "FSM", 0.1, size=(12, 10), seed=5).build()
+    renderer = PygameRenderer(sim.grid)
+    yield sim, renderer
+    renderer.close()
+
+
+def pixels(renderer):
+    return pygame.surfarray.array3d(renderer.screen)
+
+
+def full_redraw(renderer, snapshot):
+    renderer._world = None
+    renderer.draw(snapshot)
+    return pixels(renderer)
+
+
+def test_dirty_tiles_match_a_full_redraw(world, monkeypatch):
+    sim, renderer = world
+    renderer.draw(sim.snapshot())
+    updates = []
+    monkeypatch.setattr(pygame.display, "update", updates.append)
+    for _ in range(4):
+        before = sim.snapshot().tiles
+        sim.step()
+        snapshot = sim.snapshot()
+        renderer.draw(snapshot)
+        incremental = pixels(renderer)
+        np.testing.assert_array_equal(incremental, full_redraw(renderer, snapshot))
+
+        # Only the changed tiles (and the HUD) were pushed to the display
+        changed = set(zip(*np.nonzero(before != snapshot.tiles)))
+        tiles = {(r.x // TILE_SIZE, r.y // TILE_SIZE) for r in updates[-1] if r.size == (TILE_SIZE, TILE_SIZE)}
+        assert changed <= tiles
+        assert len(updates[-1]) < snapshot.tiles.size
+
+
+def test_draws_scheduler_snapshots(world):
+    sim, renderer = world
+    scheduler = Scheduler(sim, turns_per_frame=1).start()
+    try:
+        drawn = set()
+        for _ in range(20):
+            scheduler.frame()
+            snapshot = scheduler.latest()
+            renderer.draw(snapshot)
+            drawn.add(snapshot.turn)
+            if snapshot.extinct:
+                break
+            pygame.time.wait(5)
+    finally:
+        scheduler.stop()
+    assert len(drawn) > 1
+    np.testing.assert_array_equal(pixels(renderer), full_redraw(renderer, snapshot))
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from benchmarks.scenarios import Scenario
+from core.replay import Recorder, Replay
+
+
+def snapshot(sim):
+    pop = sim.grid.population
+    ids = pop.alive_ids()
+    return ids, pop.x[ids], pop.y[ids], pop.sex[ids], pop.mutant[ids], pop.age[ids]
+
+
+def record(tmp_path, keyframe_every, turns=20):
+    sim = Scenario(100, "FSM", 0.1, size=(30, 30), seed=5).build()
+    recorder = Recorder(sim, keyframe_every=keyframe_every)
+    states = {sim.turn: snapshot(sim)}
+    for _ in range(turns):
+        sim.step()
+        states[sim.turn] = snapshot(sim)
+    path = tmp_path / f"run_{keyframe_every}.npz"
+    recorder.save(path)
+    return Replay.load(path), states
+
+
+@pytest.mark.parametrize("keyframe_every", [1, 7, 1000])
+def test_every_turn_rebuilds_to_the_recorded_world(tmp_path, keyframe_every):
+    replay, states = record(tmp_path, keyframe_every)
+    assert replay.last_turn == max(states)
+    for turn, (ids, x, y, sex, mutant, age) in states.items():
+        world = replay.state_at(turn)
+        np.testing.assert_array_equal(world.ids, ids)
+        np.testing.assert_array_equal(world.x, x)
+        np.testing.assert_array_equal(world.y, y)
+        np.testing.assert_array_equal(world.sex, sex)
+        np.testing.assert_array_equal(world.mutant, mutant)
+        np.testing.assert_array_equal(world.age, age)
+    with pytest.raises(ValueError):
+        replay.state_at(replay.last_turn + 1)
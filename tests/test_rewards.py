@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from benchmarks.scenarios import Scenario
+from core.fsm_dispatcher import ROLE_REWARDS, ROLE_BATCH_REWARDS
+from core.population import ROLES
+
+
+@pytest.mark.parametrize("population, vampire_ratio", [(12, 0.2), (300, 0.05), (60, 0.3)])
+def test_batched_rewards_match_scalar(population, vampire_ratio):
+    sim = Scenario(population, "RL-batched", vampire_ratio, seed=3).build()
+    rng = np.random.default_rng(0)
+    checked = set()
+    for _ in range(3):
+        sim.step()
+        grid, pop = sim.grid, sim.grid.population
+        ids = pop.alive_ids()
+        pop.has_baby[ids] = rng.random(len(ids)) < 0.3
+        roles = pop.roles(ids)
+        for code, role in enumerate(ROLES):
+            group = ids[roles == code]
+            if not len(group):
+                continue
+            batched = ROLE_BATCH_REWARDS[role](group, grid)
+            scalar = [ROLE_REWARDS[role](pop.views[i], grid) for i in group]
+            np.testing.assert_array_equal(batched, scalar)
+            checked.add(role)
+    assert {"male", "female"} <= checked
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from benchmarks.scenarios import Scenario
+from core.scheduler import Scheduler
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.001)
+
+
+def test_snapshots_follow_the_worker():
+    sim = Scenario(60, "FSM", 0.05, seed=1).build()
+    built = []
+    take = sim.snapshot
+    sim.snapshot = lambda: built.append(sim.turn) or take()
+    scheduler = Scheduler(sim, speed=None, max_turns=30).start()
+    turns = []
+    try:
+        wait_for(lambda: turns.append(scheduler.latest().turn) or scheduler.finished)
+    finally:
+        scheduler.stop()
+    final = scheduler.latest()
+    assert final.turn == sim.turn and final.population == len(sim.grid.bunnies)
+    assert turns == sorted(turns)
+    # Snapshots are only built for turns after the viewer asked, plus the last one
+    assert built[-1] == sim.turn and len(built) <= len(turns) + 1
+
+
+def test_turns_per_frame_runs_exactly_k_turns_per_frame():
+    sim = Scenario(200, "FSM", 0.0, seed=2).build()
+    scheduler = Scheduler(sim, turns_per_frame=3).start()
+    try:
+        for frame in range(1, 4):
+            scheduler.frame()
+            wait_for(lambda: sim.turn == 3 * frame)
+            time.sleep(0.02)  # no frame, no turns
+            assert sim.turn == 3 * frame
+    finally:
+        scheduler.stop()
+
+
+def test_worker_errors_reach_the_viewer():
+    sim = Scenario(40, "FSM", 0.05, seed=3).build()
+    step = sim.step
+
+    def failing_step():
+        if sim.turn == 2:
+            raise ValueError("turn 3 failed")
+        return step()
+
+    sim.step = failing_step
+    scheduler = Scheduler(sim, speed=None).start()
+    wait_for(lambda: scheduler.finished)
+    with pytest.raises(ValueError, match="turn 3 failed"):
+        scheduler.latest()
+    scheduler.stop()  # raised once only
+
+    scheduler = Scheduler(sim, speed=None).start()
+    wait_for(lambda: scheduler.finished)
+    with pytest.raises(ValueError):
+        scheduler.stop()
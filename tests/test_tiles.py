@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.occupancy import TiledArray, TILE
+
+
+def test_tiled_array_matches_dense():
+    rng = np.random.default_rng(1)
+    width, height = 2 * TILE + 5, TILE + 3
+    tiled = TiledArray(width, height, np.int32, fill=-1)
+    dense = np.full((width, height), -1, dtype=np.int32)
+    for _ in range(200):
+        x, y = int(rng.integers(width)), int(rng.integers(height))
+        value = int(rng.integers(-1, 5))
+        tiled[x, y] = value
+        dense[x, y] = value
+    xs, ys = rng.integers(0, width, 50), rng.integers(0, height, 50)
+    tiled.add_at(xs, ys, 2)
+    np.add.at(dense, (xs, ys), 2)
+    tiled.set_window(TILE - 3, TILE + 4, 1, 9, np.arange(56).reshape(7, 8))
+    dense[TILE - 3:TILE + 4, 1:9] = np.arange(56).reshape(7, 8)
+    tiled.move(0, 0, width - 1, height - 1)
+    dense[width - 1, height - 1], dense[0, 0] = dense[0, 0], -1
+
+    np.testing.assert_array_equal(tiled.to_dense(), dense)
+    np.testing.assert_array_equal(tiled[xs, ys], dense[xs, ys])
+    np.testing.assert_array_equal(tiled.window(3, TILE + 9, 2, height), dense[3:TILE + 9, 2:])
+    assert tiled.argmax() == np.unravel_index(np.argmax(dense), dense.shape)
+    # Off-array positions read as the given value
+    assert tiled.take([-1, 0, width], [0, 0, 0], outside=-2).tolist() == [-2, dense[0, 0], -2]
+
+
+def test_writing_fill_does_not_allocate():
+    tiled = TiledArray(4 * TILE, 4 * TILE, np.int16, fill=9)
+    tiled[5, 5] = 9
+    tiled.set_window(0, 3 * TILE, 0, 3 * TILE, np.full((3 * TILE, 3 * TILE), 9))
+    assert tiled.tiles == 0
+    tiled[TILE, 2 * TILE] = 1
+    assert tiled.tiles == 1 and tiled.item(TILE, 2 * TILE) == 1 and tiled.item(0, 0) == 9
@@ -0,0 +1,29 @@
+import itertools
+
+import numpy as np
+
+from core.qtable import QTable
+from core.trainer import merge_worker_tables
+
+
+def test_merge_is_the_mean_of_the_workers_that_visited():
+    base = QTable()
+    base.q[0] = 1.0
+    base.visited[0] = True
+    workers = []
+    for k, states in enumerate(([0, 1, 2], [0, 2], [0, 3])):
+        table = base.copy()
+        table.q[states] = 10.0 * (k + 1)
+        table.visited[states] = True
+        workers.append({"male": table})
+
+    merged = merge_worker_tables({"male": base}, workers)["male"]
+    assert merged.q[0, 0] == (10 + 20 + 30) / 3
+    assert merged.q[1, 0] == 10        # only the first worker
+    assert merged.q[2, 0] == (10 + 20) / 2
+    assert merged.q[3, 0] == 30
+    assert not merged.visited[4:].any() and merged.q[4:].max() == 0
+    assert base.q[0, 0] == 1.0         # inputs are left alone
+
+    for order in itertools.permutations(workers):
+        np.testing.assert_array_equal(merge_worker_tables({"male": base}, list(order))["male"].q, merged.q)
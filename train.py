@@ -0,0 +1,42 @@
+# train.py
+
+import argparse
+from core.trainer import train
+from core.rl_agent import save_shared_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless parallel Q-table training")
+    parser.add_argument("--episodes", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-turns", type=int, default=1000, help="turn cap per episode")
+    parser.add_argument("--sync-every", type=int, default=5,
+                        help="episodes each worker runs between table merges")
+    parser.add_argument("--mode", choices=["RL", "FSM"], default="RL")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batched", action="store_true",
+                        help="run each role's RL agents as one vectorized batch per turn")
+    parser.add_argument("--width", type=int, default=None)
+    parser.add_argument("--height", type=int, default=None)
+    args = parser.parse_args()
+
+    size = {k: v for k, v in (("width", args.width), ("height", args.height)) if v is not None}
+    shared_tables, stats = train(
+        episodes=args.episodes,
+        workers=args.workers,
+        max_turns=args.max_turns,
+        sync_every=args.sync_every,
+        mode=args.mode,
+        seed=args.seed,
+        batched=args.batched,
+        **size,
+    )
+
+    save_shared_tables(shared_tables)
+    best = max(stats, key=lambda s: s["max_population"])
+    print(f"[INFO] {len(stats)} episodes, best max population {best['max_population']} "
+          f"(episode {best['episode']})")
+
+
+if __name__ == "__main__":
+    main()
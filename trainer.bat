@@ -1,24 +1,12 @@
 @echo off
-setlocal enabledelayedexpansion
+setlocal
 
-:: Set the number of runs
-set RUNS=500
+:: Headless training: episodes run in parallel, Q-tables merge in-process
+set EPISODES=500
+set WORKERS=%NUMBER_OF_PROCESSORS%
 
-:: Loop counter
-set COUNT=1
+echo Training Bunny agents... (%EPISODES% episodes on %WORKERS% workers)
+python train.py --episodes %EPISODES% --workers %WORKERS% --max-turns 1000
 
-:loop
-echo Running Bunny Simulation... (Run !COUNT! of %RUNS%)
-python main.py
-
-:: Wait a bit (optional)
-sleep 1
-
-:: Increment counter
-set /a COUNT+=1
-
-:: Check if done
-if !COUNT! LEQ %RUNS% goto loop
-
-echo Done running %RUNS% simulations.
+echo Done running %EPISODES% simulations.
 pause